@@ -0,0 +1,168 @@
+# app/compression.py
+"""
+Compressão de respostas negociada por Accept-Encoding (zstd > gzip).
+
+Middleware ASGI puro, para funcionar tanto com respostas completas quanto com
+StreamingResponse: em respostas de um único corpo comprime tudo de uma vez e
+ajusta o Content-Length; em streaming comprime cada chunk com flush, para o
+cliente receber os pedaços assim que forem gerados.
+
+Configuração (env):
+- MIRAI_COMPRESSION_MIN_SIZE  (bytes; abaixo disso a resposta vai sem compressão)
+- MIRAI_GZIP_LEVEL / MIRAI_ZSTD_LEVEL
+"""
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # zstd é opcional; sem ele negociamos só gzip
+    zstandard = None
+
+MIN_SIZE = int(os.getenv("MIRAI_COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("MIRAI_GZIP_LEVEL", "6"))
+ZSTD_LEVEL = int(os.getenv("MIRAI_ZSTD_LEVEL", "3"))
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Escolhe "zstd" ou "gzip" a partir do header Accept-Encoding (respeita q=0).
+    Em empate de qualidade, zstd ganha.
+    """
+    supported = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for enc in supported:
+        q = weights.get(enc, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits=31 -> container gzip
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def chunk(self, data: bytes) -> bytes:
+        """Comprime e faz flush, para o chunk chegar ao cliente imediatamente."""
+        return self._obj.compress(data) + self._obj.flush(self._flush_mode)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            async def send_with_vary(message: Message) -> None:
+                # a mesma URL pode sair comprimida para outro cliente: caches precisam do Vary
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    if "content-encoding" not in headers:
+                        headers.add_vary_header("Accept-Encoding")
+                await send(message)
+
+            await self.app(scope, receive, send_with_vary)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Segura o start até ver o primeiro chunk do corpo
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start["headers"])
+
+            if not more_body:
+                # Resposta completa: só comprime acima do limite
+                if len(body) < self.minimum_size:
+                    self.passthrough = True
+                    headers.add_vary_header("Accept-Encoding")
+                    await self.send(start)
+                    await self.send(message)
+                    return
+                compressed = _Compressor(self.encoding).finish(body)
+                headers["Content-Encoding"] = self.encoding
+                headers["Content-Length"] = str(len(compressed))
+                headers.add_vary_header("Accept-Encoding")
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming: tamanho final desconhecido, comprime chunk a chunk
+            self.compressor = _Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if "content-length" in headers:
+                del headers["content-length"]
+            await self.send(start)
+
+        if more_body:
+            data = self.compressor.chunk(body)
+        else:
+            data = self.compressor.finish(body)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
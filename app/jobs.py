@@ -0,0 +1,338 @@
+# app/jobs.py
+"""
+Jobs em lote: gera planos (e opcionalmente aulas) para vários temas de uma vez.
+
+Fila persistida em SQLite (stdlib) para sobreviver a restart do processo:
+cada item é "arrendado" (lease) por um worker; se o processo morrer no meio,
+o lease expira e outro worker retoma o item. O claim usa BEGIN IMMEDIATE, então
+funciona também com vários processos (gunicorn) apontando para o mesmo arquivo.
+
+Configuração (env):
+- MIRAI_JOBS_DB            (caminho do SQLite; padrão mirai_jobs.db)
+- MIRAI_JOB_WORKERS        (threads por processo; 0 desliga o processamento)
+- MIRAI_JOB_MAX_ATTEMPTS   (tentativas por item antes de marcar como failed)
+- MIRAI_JOB_LEASE_SECONDS  (tempo máximo de um item "running" sem renovação antes de ser retomado)
+
+Cada claim gera um token de lease; complete/fail/renew só valem para quem
+ainda detém o lease, então um worker lento cujo item foi retomado por outro
+não sobrescreve o resultado. Enquanto processa, o worker renova o lease.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+from typing import Optional
+
+JOBS_DB = os.getenv("MIRAI_JOBS_DB", "mirai_jobs.db")
+JOB_WORKERS = int(os.getenv("MIRAI_JOB_WORKERS", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("MIRAI_JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("MIRAI_JOB_LEASE_SECONDS", "300"))
+_POLL_SECONDS = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    params      TEXT NOT NULL,
+    total       INTEGER NOT NULL,
+    created_at  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id        TEXT NOT NULL,
+    idx           INTEGER NOT NULL,
+    tema          TEXT NOT NULL,
+    question      TEXT NOT NULL,
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | running | done | failed
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    available_at  REAL NOT NULL,
+    plan          TEXT,
+    lesson        TEXT,
+    error         TEXT,
+    lease         TEXT,
+    updated_at    REAL NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS ix_job_items_claim ON job_items (status, available_at);
+"""
+
+
+class JobStore:
+    def __init__(self, path: str = JOBS_DB):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            # bancos criados antes do token de lease
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(job_items)")}
+            if "lease" not in columns:
+                conn.execute("ALTER TABLE job_items ADD COLUMN lease TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def submit(self, items: list[dict], params: dict) -> str:
+        """Cria o job e enfileira um item por tema. Retorna o job_id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO jobs (id, params, total, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False), len(items), now),
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, tema, question, available_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(job_id, i, it["tema"], it["question"], now, now) for i, it in enumerate(items)],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """
+        Pega o próximo item pronto (pending, ou running com lease vencido) e marca
+        como running com um token de lease novo (item["lease"]). Retorna None se
+        não houver nada. Itens cujo lease venceu na última tentativa viram failed
+        em vez de serem retomados para sempre.
+        """
+        now = time.time()
+        lease = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE job_items SET status = 'failed', lease = NULL, updated_at = ?, "
+                "error = COALESCE(error, 'lease expirou na última tentativa') "
+                "WHERE status = 'running' AND available_at <= ? AND attempts >= ?",
+                (now, now, JOB_MAX_ATTEMPTS),
+            )
+            row = conn.execute(
+                """
+                SELECT i.job_id, i.idx, i.tema, i.question, i.attempts, j.params
+                FROM job_items i JOIN jobs j ON j.id = i.job_id
+                WHERE i.status IN ('pending', 'running') AND i.available_at <= ? AND i.attempts < ?
+                ORDER BY i.available_at, j.created_at, i.idx
+                LIMIT 1
+                """,
+                (now, JOB_MAX_ATTEMPTS),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE job_items SET status = 'running', attempts = attempts + 1, lease = ?, available_at = ?, "
+                "updated_at = ? WHERE job_id = ? AND idx = ?",
+                (lease, now + JOB_LEASE_SECONDS, now, row["job_id"], row["idx"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        item = dict(row)
+        item["attempts"] += 1
+        item["lease"] = lease
+        item["params"] = json.loads(item["params"])
+        return item
+
+    # As escritas abaixo só valem para o dono do lease: retornam False se o item
+    # já foi retomado por outro worker (ou finalizado).
+    _OWNED = "WHERE job_id = ? AND idx = ? AND status = 'running' AND lease = ?"
+
+    def renew(self, job_id: str, idx: int, lease: str) -> bool:
+        """Estende o lease de um item em processamento."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                f"UPDATE job_items SET available_at = ?, updated_at = ? {self._OWNED}",
+                (now + JOB_LEASE_SECONDS, now, job_id, idx, lease),
+            )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, idx: int, lease: str, plan: str, lesson: Optional[str]) -> bool:
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE job_items SET status = 'done', plan = ?, lesson = ?, error = NULL, lease = NULL, "
+                f"updated_at = ? {self._OWNED}",
+                (plan, lesson, time.time(), job_id, idx, lease),
+            )
+        return cur.rowcount == 1
+
+    def fail(self, job_id: str, idx: int, lease: str, attempts: int, error: str) -> bool:
+        """Reagenda com backoff exponencial ou marca como failed após o limite."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            if attempts >= JOB_MAX_ATTEMPTS:
+                cur = conn.execute(
+                    f"UPDATE job_items SET status = 'failed', error = ?, lease = NULL, updated_at = ? {self._OWNED}",
+                    (error, now, job_id, idx, lease),
+                )
+            else:
+                cur = conn.execute(
+                    "UPDATE job_items SET status = 'pending', error = ?, lease = NULL, available_at = ?, "
+                    f"updated_at = ? {self._OWNED}",
+                    (error, now + 2 ** attempts, now, job_id, idx, lease),
+                )
+        return cur.rowcount == 1
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with closing(self._connect()) as conn:
+            job = conn.execute("SELECT id, total, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = {
+                r["status"]: r["n"]
+                for r in conn.execute(
+                    "SELECT status, COUNT(*) AS n FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+                )
+            }
+        done, failed = counts.get("done", 0), counts.get("failed", 0)
+        return {
+            "job_id": job["id"],
+            "total": job["total"],
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": done,
+            "failed": failed,
+            "finished": done + failed == job["total"],
+            "created_at": job["created_at"],
+        }
+
+    def results(self, job_id: str) -> list[dict]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT idx, tema, status, attempts, plan, lesson, error FROM job_items WHERE job_id = ? ORDER BY idx",
+                (job_id,),
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def process_item(item: dict) -> tuple[str, Optional[str]]:
+    """Gera o plano (e a aula, se pedido) de um tema usando os mesmos agentes das rotas."""
+    from app.mirai_agents.planner_agent import PlannerAgent
+    from app.mirai_agents.teacher_agent import TeacherAgent
+    from app.mirai_agents.routing import route_model, record_route
+    from app.scheduler import BULK, priority_context
+
+    params = item["params"]
+    # jobs em lote sempre disputam o upstream como bulk
+    with priority_context(BULK, params.get("tenant")):
+        context_schema = params.get("context_schema")
+
+        prompt_text = item["question"] + item["tema"] + (context_schema or "")
+        decision = route_model("planner", prompt_text, model_name=params.get("model_name"))
+        started = time.perf_counter()
+        plan = PlannerAgent(model_name=decision.model_name, temperature=params["temperature"]).plan(
+            question=item["question"], tema=item["tema"], context_schema=context_schema
+        )
+        record_route(decision, time.perf_counter() - started, len(prompt_text), len(plan))
+        if not plan:
+            raise RuntimeError("Saída vazia do planner.")
+
+        lesson = None
+        if params.get("include_lesson"):
+            prompt_text = item["tema"] + plan
+            decision = route_model("professor", prompt_text, model_name=params.get("model_name"))
+            agent = TeacherAgent(model_name=decision.model_name, temperature=params["temperature"])
+            teach_fn = agent.teach_sections if params.get("mode") == "sections" else agent.teach
+            started = time.perf_counter()
+            lesson = teach_fn(question=item["tema"], plan=plan)
+            record_route(decision, time.perf_counter() - started, len(prompt_text), len(lesson))
+            if not lesson:
+                raise RuntimeError("Saída vazia do professor.")
+        return plan, lesson
+
+
+class JobWorkerPool:
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for n in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"mirai-job-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Para de pegar itens novos; os em andamento terminam (ou o lease expira)."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self.store.claim()
+            except Exception:
+                traceback.print_exc()
+                item = None
+            if item is None:
+                self._stop.wait(_POLL_SECONDS)
+                continue
+            key = (item["job_id"], item["idx"], item["lease"])
+            done = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(key, done), daemon=True)
+            heartbeat.start()
+            try:
+                plan, lesson = process_item(item)
+                owned = self.store.complete(*key, plan, lesson)
+            except Exception as e:
+                print(f"[JOBS] item {item['job_id']}/{item['idx']} falhou (tentativa {item['attempts']}): {e}")
+                owned = self.store.fail(*key, item["attempts"], str(e))
+            finally:
+                done.set()
+                heartbeat.join()
+            if not owned:
+                print(f"[JOBS] item {item['job_id']}/{item['idx']}: lease perdido, resultado descartado")
+
+    def _heartbeat(self, key: tuple, done: threading.Event) -> None:
+        """Renova o lease a cada 1/3 do prazo enquanto o item é processado."""
+        while not done.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                if not self.store.renew(*key):
+                    return
+            except Exception:
+                traceback.print_exc()
+
+
+_store: Optional[JobStore] = None
+_pool: Optional[JobWorkerPool] = None
+
+
+def get_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore()
+    return _store
+
+
+def start_workers() -> None:
+    global _pool
+    if JOB_WORKERS > 0 and _pool is None:
+        _pool = JobWorkerPool(get_store())
+        _pool.start()
+
+
+def stop_workers() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.stop(timeout=5)
+        _pool = None
+
+
+__all__ = ["JobStore", "JobWorkerPool", "get_store", "start_workers", "stop_workers"]
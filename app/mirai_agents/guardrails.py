@@ -6,6 +6,8 @@ from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage
 from dotenv import load_dotenv
 
+from app.scheduler import upstream_slot
+
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -101,8 +103,8 @@ def analyze_guardrails(question: str, schema: str = "", model=None):
         # Configured model (default = creative_model)
         if model is None:
             from app.mirai_agents.models import creative_model  # lazy import
-            response = creative_model.invoke([HumanMessage(content=message)])
-        else:
+            model = creative_model
+        with upstream_slot():
             response = model.invoke([HumanMessage(content=message)])
 
         content = getattr(response, "content", str(response))
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -19,3 +20,16 @@ logical_model = ChatGoogleGenerativeAI(
     api_key=gemini_api_key,
     temperature=0.1,
 )
+
+
+@lru_cache(maxsize=32)
+def get_model(model_name: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """
+    Modelo por (nome, temperatura), reaproveitado entre requisições. Os dois vêm
+    do cliente, então o cache é limitado (LRU) para não crescer sem fim.
+    """
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        api_key=gemini_api_key,
+        temperature=temperature,
+    )
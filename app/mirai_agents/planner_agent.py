@@ -8,6 +8,8 @@ from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from app.scheduler import upstream_slot
+
 # Carrega .env
 load_dotenv(".env")
 
@@ -100,7 +102,8 @@ class PlannerAgent:
     def plan(self, question: str, tema: str, context_schema: str | None = None) -> str:
         schema_to_use = context_schema.strip() if context_schema else DEFAULT_SCHEMA
         msg = self.template.format(context_schema=schema_to_use, question=question or "", tema=tema or "")
-        resp = self._llm.invoke([HumanMessage(content=msg)])
+        with upstream_slot():
+            resp = self._llm.invoke([HumanMessage(content=msg)])
         if isinstance(resp, AIMessage):
             return (resp.content or "").strip()
         return (getattr(resp, "content", None) or str(resp)).strip()
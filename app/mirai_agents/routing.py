@@ -0,0 +1,185 @@
+# app/mirai_agents/routing.py
+"""
+Roteamento adaptativo de modelo por complexidade da requisição.
+
+Usa apenas sinais locais e baratos (tipo de agente, tamanho da entrada e a
+classificacao_pergunta do guardrails, quando o cliente já a tem) para escolher
+um tier de modelo. Se o cliente mandar model_name explicitamente, ele é
+respeitado e a decisão fica registrada como tier "explicit".
+
+As regras podem ser sobrescritas por um JSON apontado em MIRAI_ROUTING_CONFIG,
+com as mesmas chaves de DEFAULT_ROUTING_CONFIG (merge raso por chave). O
+arquivo é validado no import: tier sem "model" ou agente apontando para tier
+inexistente falham no startup, não na requisição. Preços ausentes valem 0.
+Com model_name explícito o custo usa o preço do tier que tem esse modelo; se
+nenhum tiver, o custo estimado fica desconhecido (null), não zero.
+"""
+import json
+import os
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Optional
+
+DEFAULT_ROUTING_CONFIG = {
+    # ordem importa: do mais leve para o mais forte
+    "tiers": {
+        "light": {"model": "gemini-1.5-flash-8b", "input_cost_per_1m": 0.0375, "output_cost_per_1m": 0.15},
+        "standard": {"model": "gemini-1.5-flash", "input_cost_per_1m": 0.075, "output_cost_per_1m": 0.30},
+        "strong": {"model": "gemini-1.5-pro", "input_cost_per_1m": 1.25, "output_cost_per_1m": 5.00},
+    },
+    # tier base por agente
+    "agents": {
+        "natural": "light",
+        "guardrails": "light",
+        "schema": "standard",
+        "planner": "standard",
+        "professor": "standard",
+    },
+    # ajuste (em degraus de tier) pela classificação do guardrails
+    "classificacao": {
+        "conversa_sem_query": -1,
+        "conversa_com_query": 0,
+        "sessao_de_estudos": 1,
+    },
+    # entradas curtas descem um degrau, longas sobem um
+    "short_chars": 200,
+    "long_chars": 2000,
+}
+
+
+def validate_config(config: dict) -> dict:
+    """Confere a estrutura e completa os preços ausentes com 0."""
+    tiers = config.get("tiers")
+    if not isinstance(tiers, dict) or not tiers:
+        raise ValueError("Config de roteamento: 'tiers' deve ser um objeto não vazio.")
+    for name, tier in tiers.items():
+        if not isinstance(tier, dict) or not tier.get("model"):
+            raise ValueError(f"Config de roteamento: tier '{name}' sem 'model'.")
+        tier["input_cost_per_1m"] = float(tier.get("input_cost_per_1m", 0.0))
+        tier["output_cost_per_1m"] = float(tier.get("output_cost_per_1m", 0.0))
+    for agent, tier in config.get("agents", {}).items():
+        if tier not in tiers:
+            raise ValueError(f"Config de roteamento: agente '{agent}' aponta para tier inexistente '{tier}'.")
+    for key in ("short_chars", "long_chars"):
+        config[key] = int(config[key])
+    return config
+
+
+def _load_config() -> dict:
+    config = json.loads(json.dumps(DEFAULT_ROUTING_CONFIG))  # cópia profunda
+    path = os.getenv("MIRAI_ROUTING_CONFIG")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    return validate_config(config)
+
+
+ROUTING_CONFIG = _load_config()
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    agent: str
+    tier: str
+    model_name: str
+
+
+def route_model(
+    agent: str,
+    text: str,
+    classificacao: Optional[str] = None,
+    model_name: Optional[str] = None,
+    config: Optional[dict] = None,
+) -> RouteDecision:
+    """
+    Decide qual modelo usar. `text` é toda a entrada que vai para o prompt.
+    """
+    if model_name:
+        return RouteDecision(agent=agent, tier="explicit", model_name=model_name)
+
+    config = config or ROUTING_CONFIG
+    tier_names = list(config["tiers"])
+    base = config["agents"].get(agent, "standard")
+    idx = tier_names.index(base) if base in tier_names else len(tier_names) // 2
+
+    if classificacao:
+        idx += int(config["classificacao"].get(classificacao.strip().lower(), 0))
+
+    size = len(text or "")
+    if size <= config["short_chars"]:
+        idx -= 1
+    elif size >= config["long_chars"]:
+        idx += 1
+
+    idx = max(0, min(idx, len(tier_names) - 1))
+    tier = tier_names[idx]
+    return RouteDecision(agent=agent, tier=tier, model_name=config["tiers"][tier]["model"])
+
+
+# ============================
+# Métricas (em memória, por processo)
+# ============================
+_metrics_lock = threading.Lock()
+_metrics: dict = {}
+
+
+def _prices(decision: RouteDecision) -> Optional[dict]:
+    """Preço do tier; para model_name explícito, o do tier que usa esse modelo."""
+    tiers = ROUTING_CONFIG["tiers"]
+    if decision.tier in tiers:
+        return tiers[decision.tier]
+    for tier in tiers.values():
+        if tier["model"] == decision.model_name:
+            return tier
+    return None
+
+
+def _estimate_cost(decision: RouteDecision, input_chars: int, output_chars: int) -> Optional[float]:
+    """None quando o modelo não aparece em nenhum tier (custo desconhecido, não zero)."""
+    prices = _prices(decision)
+    if prices is None:
+        return None
+    # aproximação grosseira: ~4 caracteres por token
+    return (
+        input_chars / 4 * prices.get("input_cost_per_1m", 0.0)
+        + output_chars / 4 * prices.get("output_cost_per_1m", 0.0)
+    ) / 1_000_000
+
+
+def record_route(decision: RouteDecision, latency_s: float, input_chars: int, output_chars: int) -> None:
+    """Registra a métrica. Nunca levanta: falha de métrica não pode derrubar a resposta."""
+    try:
+        key = (decision.agent, decision.tier, decision.model_name)
+        cost = _estimate_cost(decision, input_chars, output_chars)
+        with _metrics_lock:
+            m = _metrics.setdefault(key, {"requests": 0, "latency_s": 0.0, "max_latency_s": 0.0, "estimated_cost_usd": 0.0})
+            m["requests"] += 1
+            m["latency_s"] += latency_s
+            m["max_latency_s"] = max(m["max_latency_s"], latency_s)
+            if cost is None or m["estimated_cost_usd"] is None:
+                m["estimated_cost_usd"] = None
+            else:
+                m["estimated_cost_usd"] += cost
+    except Exception:
+        print("[ROUTING] Falha ao registrar métrica:")
+        traceback.print_exc()
+
+
+def routing_metrics() -> list[dict]:
+    with _metrics_lock:
+        return [
+            {
+                "agent": agent,
+                "tier": tier,
+                "model_name": model,
+                "requests": m["requests"],
+                "avg_latency_s": m["latency_s"] / m["requests"],
+                "max_latency_s": m["max_latency_s"],
+                "estimated_cost_usd": m["estimated_cost_usd"],
+            }
+            for (agent, tier, model), m in sorted(_metrics.items())
+        ]
+
+
+__all__ = ["RouteDecision", "route_model", "record_route", "routing_metrics", "validate_config", "DEFAULT_ROUTING_CONFIG"]
@@ -9,6 +9,8 @@ from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from app.scheduler import upstream_slot
+
 # Carrega .env (idempotente)
 load_dotenv(find_dotenv(filename=".env"), override=False)
 
@@ -105,7 +107,8 @@ class SchemaAgent:
         print("\n[DEBUG] PROMPT ENVIADO AO MODELO:\n", msg)
 
         # --- Chamada ao modelo ---
-        resp = self._llm.invoke([HumanMessage(content=msg)])
+        with upstream_slot():
+            resp = self._llm.invoke([HumanMessage(content=msg)])
         if isinstance(resp, AIMessage):
             raw_text = (resp.content or "").strip()
         else:
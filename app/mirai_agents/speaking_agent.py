@@ -6,6 +6,8 @@ from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from app.scheduler import upstream_slot
+
 # carregar .env
 load_dotenv(find_dotenv(filename=".env"), override=False)
 
@@ -61,10 +63,11 @@ class FriendlyAgent:
         ctx = f"\nContexto SQL:\n{context_sql.strip()}" if context_sql else ""
         msg = self.template.format(question=question.strip(), context_sql=ctx)
 
-        resp = self._llm.invoke([
-            SystemMessage(content=self.system_message),
-            HumanMessage(content=msg)
-        ])
+        with upstream_slot():
+            resp = self._llm.invoke([
+                SystemMessage(content=self.system_message),
+                HumanMessage(content=msg)
+            ])
 
         if isinstance(resp, AIMessage):
             return (resp.content or "").strip()
@@ -1,12 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Iterator, Optional
+import contextvars
 import os
+import re
 
 from dotenv import load_dotenv
 from langchain.prompts import PromptTemplate
 from langchain.schema import HumanMessage, AIMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 
+from app.profiling import profile_thread
+from app.scheduler import upstream_slot
+
 # Carrega .env
 load_dotenv(".env")
 
@@ -44,17 +50,89 @@ e busca conteúdos educacionais confiáveis para proporcionar uma experiência d
 - Próximos passos conforme cronograma
 """
 
+# --- Modo "sections": esboço curto + seções geradas em paralelo ---
+_OUTLINE_TEMPLATE = """
+## AGENTE PROFESSOR - ESBOÇO DA AULA
+
+A partir do plano abaixo, liste APENAS os títulos das seções da aula, na ordem
+em que serão apresentadas, um por linha, sem numeração e sem texto extra.
+Use entre {min_sections} e {max_sections} seções.
+
+## ASSUNTO ESTUDADO:
+{question}
+
+## PLANO DE ESTUDOS A SER APLICADO:
+{plan}
+
+## CONTEXTO DA ÚLTIMA SESSÃO (opcional):
+{context_schema}
+"""
+
+_SECTION_TEMPLATE = """
+## AGENTE PROFESSOR - EDUCADOR DIGITAL RESPONSÁVEL
+
+Você está escrevendo UMA seção de uma aula maior. Escreva somente o conteúdo
+da seção indicada, em markdown, sem repetir o título e sem antecipar as demais.
+
+## ASSUNTO ESTUDADO:
+{question}
+
+## PLANO DE ESTUDOS A SER APLICADO:
+{plan}
+
+## CONTEXTO DA ÚLTIMA SESSÃO (opcional):
+{context_schema}
+
+## ESBOÇO COMPLETO DA AULA:
+{outline}
+
+## SEÇÃO A ESCREVER:
+{title}
+"""
+
+# usado se o esboço vier vazio/ilegível
+DEFAULT_SECTIONS = [
+    "Aula estruturada conforme o plano",
+    "Exemplos práticos",
+    "Verificação de compreensão",
+    "Próximos passos",
+]
+
 def _default_prompt() -> PromptTemplate:
     return PromptTemplate(
         input_variables=["question", "plan", "context_schema"],
         template=_TEACHER_TEMPLATE
     )
 
+def _outline_prompt() -> PromptTemplate:
+    return PromptTemplate(
+        input_variables=["question", "plan", "context_schema", "min_sections", "max_sections"],
+        template=_OUTLINE_TEMPLATE
+    )
+
+def _section_prompt() -> PromptTemplate:
+    return PromptTemplate(
+        input_variables=["question", "plan", "context_schema", "outline", "title"],
+        template=_SECTION_TEMPLATE
+    )
+
+def parse_outline(text: str, max_sections: int = 8) -> list[str]:
+    """Extrai os títulos do esboço (remove bullets, numeração e markdown)."""
+    titles = []
+    for line in (text or "").splitlines():
+        title = re.sub(r"^\s*(?:[-*•#]+|\d+[.)])\s*", "", line).strip().strip("*").strip()
+        if title:
+            titles.append(title)
+    return titles[:max_sections] or list(DEFAULT_SECTIONS)
+
 @dataclass
 class TeacherAgent:
     model_name: str = "gemini-1.5-flash"
     temperature: float = 0.4
     template: PromptTemplate = field(default_factory=_default_prompt)
+    outline_template: PromptTemplate = field(default_factory=_outline_prompt)
+    section_template: PromptTemplate = field(default_factory=_section_prompt)
+    max_concurrency: int = 4
     _llm: Optional[ChatGoogleGenerativeAI] = field(default=None, init=False, repr=False)
 
     def __post_init__(self):
@@ -85,6 +163,13 @@ class TeacherAgent:
             except Exception as e:
                 raise RuntimeError(f"Falha ao inicializar TeacherAgent: {e}")
 
+    def _invoke(self, msg: str) -> str:
+        with upstream_slot():
+            resp = self._llm.invoke([HumanMessage(content=msg)])
+        if isinstance(resp, AIMessage):
+            return (resp.content or "").strip()
+        return (getattr(resp, "content", None) or str(resp)).strip()
+
     def teach(self, question: str, plan: str | None = None, context_schema: str | None = None) -> str:
         plan_to_use = plan.strip() if plan and plan.strip() else DEFAULT_PLAN
         msg = self.template.format(
@@ -92,9 +177,59 @@ class TeacherAgent:
             plan=plan_to_use,
             context_schema=context_schema or "Nenhum contexto anterior"
         )
-        resp = self._llm.invoke([HumanMessage(content=msg)])
-        if isinstance(resp, AIMessage):
-            return (resp.content or "").strip()
-        return (getattr(resp, "content", None) or str(resp)).strip()
+        return self._invoke(msg)
+
+    def outline(self, question: str, plan: str | None = None, context_schema: str | None = None,
+                min_sections: int = 3, max_sections: int = 6) -> list[str]:
+        """Gera só os títulos das seções (chamada curta)."""
+        msg = self.outline_template.format(
+            question=question or "",
+            plan=plan.strip() if plan and plan.strip() else DEFAULT_PLAN,
+            context_schema=context_schema or "Nenhum contexto anterior",
+            min_sections=min_sections,
+            max_sections=max_sections,
+        )
+        return parse_outline(self._invoke(msg), max_sections=max_sections)
+
+    def iter_sections(self, question: str, plan: str | None = None, context_schema: str | None = None,
+                      titles: list[str] | None = None) -> Iterator[tuple[int, str, str]]:
+        """
+        Gera as seções em paralelo (no máximo `max_concurrency` chamadas simultâneas)
+        e devolve (índice, título, conteúdo) na ordem em que cada uma termina.
+        """
+        plan_to_use = plan.strip() if plan and plan.strip() else DEFAULT_PLAN
+        ctx = context_schema or "Nenhum contexto anterior"
+        titles = titles or self.outline(question, plan_to_use, ctx)
+        outline_text = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(titles))
+
+        def _write(title: str) -> str:
+            with profile_thread():
+                return self._invoke(self.section_template.format(
+                    question=question or "",
+                    plan=plan_to_use,
+                    context_schema=ctx,
+                    outline=outline_text,
+                    title=title,
+                ))
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_concurrency, len(titles))))
+        try:
+            # copia o contexto por tarefa para manter a classe de prioridade (e o perfil) da requisição
+            futures = {
+                pool.submit(contextvars.copy_context().run, _write, title): (i, title)
+                for i, title in enumerate(titles)
+            }
+            for fut in as_completed(futures):
+                i, title = futures[fut]
+                yield i, title, fut.result()
+        finally:
+            # se uma seção falhar (ou o cliente abandonar o stream), cancela as que
+            # ainda não começaram e devolve o erro sem esperar as que estão rodando
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def teach_sections(self, question: str, plan: str | None = None, context_schema: str | None = None) -> str:
+        """Mesmo resultado de `teach`, mas via esboço + seções em paralelo, montado na ordem do esboço."""
+        sections = sorted(self.iter_sections(question, plan, context_schema))
+        return "\n\n".join(f"## {title}\n\n{content}" for _, title, content in sections).strip()
 
-__all__ = ["TeacherAgent", "DEFAULT_PLAN"]
+__all__ = ["TeacherAgent", "DEFAULT_PLAN", "DEFAULT_SECTIONS", "parse_outline"]
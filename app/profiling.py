@@ -0,0 +1,273 @@
+# app/profiling.py
+"""
+Profiling sob demanda, por requisição.
+
+Desligado por padrão: sem MIRAI_PROFILING=1 o decorator `profiled` devolve a
+própria função e o middleware nem é registrado (custo zero).
+
+Ligado, uma requisição é perfilada quando:
+- manda o header X-Mirai-Profile: wall | cpu (wall = tempo de parede, inclui a
+  espera pelo upstream; cpu = só CPU da thread) JUNTO com um X-Admin-Token
+  válido (MIRAI_ADMIN_TOKEN; sem token configurado o header é ignorado), ou
+- cai na amostragem MIRAI_PROFILE_SAMPLE_RATE (0.0–1.0, modo wall). Também
+  exige MIRAI_ADMIN_TOKEN: sem ele não há como baixar os perfis, então nada é
+  gravado.
+
+Um perfil junta tudo o que atendeu a requisição:
+- a parte no event loop (middlewares, validação do body, serialização da
+  resposta), perfilada pelo próprio middleware. Nesse trecho entram também as
+  corrotinas de outras requisições que rodarem no loop enquanto isso;
+- as threads: o handler (`profiled`), as seções paralelas do professor e cada
+  passo do stream (`profile_thread` / `profiled_iter`).
+No Python 3.12+ o cProfile usa sys.monitoring, que é global: o profiler do
+middleware já enxerga todas as threads e os demais viram no-op. No 3.11 cada
+thread tem o seu e o resultado é somado; lá só a revalidação do response_model
+das rotas síncronas (um salto de threadpool do FastAPI) fica de fora.
+
+Só um perfil por vez por processo: com outro em andamento (ou outro profiler
+ativo no processo) a requisição segue sem perfil.
+
+O resultado é salvo em formato pstats (.prof), abrível com `python -m pstats`
+ou snakeviz. O id volta no header X-Mirai-Profile-Id e o arquivo sai por
+/admin/profiles (só registrado com MIRAI_ADMIN_TOKEN definido).
+
+Configuração (env): MIRAI_PROFILING, MIRAI_PROFILE_SAMPLE_RATE, MIRAI_PROFILE_DIR,
+MIRAI_PROFILE_KEEP (quantos perfis manter no disco), MIRAI_ADMIN_TOKEN.
+"""
+import contextvars
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILING_ENABLED = os.getenv("MIRAI_PROFILING", "0").lower() in {"1", "true", "yes"}
+PROFILE_SAMPLE_RATE = float(os.getenv("MIRAI_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.getenv("MIRAI_PROFILE_DIR", "profiles"))
+PROFILE_KEEP = int(os.getenv("MIRAI_PROFILE_KEEP", "100"))
+ADMIN_TOKEN = os.getenv("MIRAI_ADMIN_TOKEN") or None
+
+PROFILE_HEADER = "x-mirai-profile"
+ADMIN_TOKEN_HEADER = "x-admin-token"
+PROFILE_ID_HEADER = "X-Mirai-Profile-Id"
+_PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def check_admin_token(token: Optional[str]) -> bool:
+    """Falha fechado: sem MIRAI_ADMIN_TOKEN configurado nenhum token vale."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+
+class _ProfileSession:
+    """Perfil de uma requisição: um cProfile por thread que a atendeu, somados no fim."""
+
+    def __init__(self, profile_id: str, mode: str):
+        self.id = profile_id
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._profilers: list[cProfile.Profile] = []
+        self._active_threads: set[int] = set()
+        self._closed = False
+
+    @contextmanager
+    def thread(self) -> Iterator[bool]:
+        """Perfila o bloco na thread corrente; False se não deu para ligar o profiler."""
+        ident = threading.get_ident()
+        with self._lock:
+            if self._closed or ident in self._active_threads:
+                nested = True
+            else:
+                nested = False
+                self._active_threads.add(ident)
+        if nested:
+            yield False
+            return
+
+        profiler = cProfile.Profile(time.thread_time if self.mode == "cpu" else time.perf_counter)
+        try:
+            profiler.enable()
+        except ValueError:
+            # 3.12+: já há um profiler no processo (se for o desta requisição, ele vê esta thread)
+            with self._lock:
+                self._active_threads.discard(ident)
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._active_threads.discard(ident)
+                if not self._closed:
+                    self._profilers.append(profiler)
+
+    def save(self) -> None:
+        # threads que terminarem depois (ex.: seção cancelada) ficam de fora
+        with self._lock:
+            self._closed = True
+            profilers = list(self._profilers)
+        if not profilers:
+            return
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(str(PROFILE_DIR / f"{self.id}.prof"))
+        files = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+        for old in files[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else []:
+            old.unlink(missing_ok=True)
+
+
+# sessão da requisição corrente, preenchida pelo middleware (propaga para o
+# threadpool do Starlette e para tarefas submetidas com copy_context)
+_requested: contextvars.ContextVar[Optional[_ProfileSession]] = contextvars.ContextVar(
+    "mirai_profile_request", default=None
+)
+# um perfil por vez por processo
+_active = threading.Lock()
+
+
+@contextmanager
+def profile_thread() -> Iterator[None]:
+    """Inclui o bloco (na thread corrente) no perfil da requisição, se houver."""
+    session = _requested.get()
+    if session is None:
+        yield
+        return
+    with session.thread():
+        yield
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Perfila o handler síncrono na thread do threadpool em que ele roda, quando a
+    requisição está sendo perfilada.
+    """
+    if not PROFILING_ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with profile_thread():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def profiled_iter(iterable: Iterable) -> Iterable:
+    """
+    Para StreamingResponse com gerador síncrono: cada next() roda numa thread do
+    threadpool, então o perfil liga e desliga a cada passo.
+    """
+    if not PROFILING_ENABLED:
+        return iterable
+    return _profiled_steps(iter(iterable))
+
+
+def _profiled_steps(it: Iterator) -> Iterator:
+    try:
+        while True:
+            with profile_thread():
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+
+
+class ProfilingMiddleware:
+    """Decide se a requisição será perfilada, perfila o event loop e devolve o id no header."""
+
+    def __init__(self, app: ASGIApp, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        mode = (headers.get(PROFILE_HEADER) or "").strip().lower()
+        if mode not in {"wall", "cpu"} or not check_admin_token(headers.get(ADMIN_TOKEN_HEADER)):
+            sampling = self.sample_rate and ADMIN_TOKEN
+            mode = "wall" if sampling and random.random() < self.sample_rate else ""
+        if not mode or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        session = _ProfileSession(uuid.uuid4().hex, mode)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_ID_HEADER] = session.id
+            await send(message)
+
+        try:
+            with session.thread() as enabled:
+                if not enabled:
+                    # outro profiler ativo no processo: segue sem perfil
+                    await self.app(scope, receive, send)
+                    return
+                token = _requested.set(session)
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    _requested.reset(token)
+            await run_in_threadpool(session.save)
+        finally:
+            _active.release()
+
+
+def list_profiles() -> list[dict]:
+    if not PROFILE_DIR.is_dir():
+        return []
+    files = sorted(PROFILE_DIR.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [{"id": p.stem, "created_at": p.stat().st_mtime, "size": p.stat().st_size} for p in files]
+
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.prof"
+    return path if path.is_file() else None
+
+
+def profile_summary(path: Path, sort: str = "cumulative", limit: int = 40) -> str:
+    """Resumo em texto (pstats), para olhar sem baixar o arquivo."""
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+__all__ = [
+    "PROFILING_ENABLED",
+    "ADMIN_TOKEN",
+    "ProfilingMiddleware",
+    "check_admin_token",
+    "profiled",
+    "profiled_iter",
+    "profile_thread",
+    "list_profiles",
+    "profile_path",
+    "profile_summary",
+]
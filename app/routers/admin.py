@@ -0,0 +1,35 @@
+# app/routers/admin.py
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import Literal, Optional
+
+from app.profiling import check_admin_token, list_profiles, profile_path, profile_summary
+
+
+def _require_admin(x_admin_token: Optional[str] = Header(None)):
+    # Falha fechado: sem MIRAI_ADMIN_TOKEN nenhum token é aceito (e o main nem registra o router)
+    if not check_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail="Token de admin inválido.")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(_require_admin)])
+
+
+@router.get("/profiles")
+def get_profiles():
+    """Perfis salvos, do mais recente para o mais antigo."""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, format: Literal["prof", "text"] = "prof",
+                sort: Literal["cumulative", "tottime", "calls"] = "cumulative", limit: int = 40):
+    """
+    format=prof devolve o arquivo pstats; format=text devolve um resumo legível.
+    """
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado.")
+    if format == "text":
+        return PlainTextResponse(profile_summary(path, sort=sort, limit=limit))
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
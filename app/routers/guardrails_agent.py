@@ -1,17 +1,20 @@
 # app/routers/guardrails_agent.py
+import time
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
 
 from app.mirai_agents.guardrails import analyze_guardrails
+from app.mirai_agents.routing import route_model, record_route
+from app.profiling import profiled
 
 router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
 
 # ====== Schemas ======
 class GuardrailsRequest(BaseModel):
     question: str = Field(..., min_length=1)
-    # campos extras já previstos para futura seleção de modelo/temperatura (opcionais)
-    model_name: Optional[str] = Field(default="gemini-1.5-flash")
+    # se model_name for omitido, a política de roteamento escolhe o tier
+    model_name: Optional[str] = Field(default=None)
     temperature: Optional[float] = Field(default=0.1, ge=0.0, le=1.0)
 
 class GuardrailsResponse(BaseModel):
@@ -19,14 +22,19 @@ class GuardrailsResponse(BaseModel):
 
 # ====== Routes ======
 @router.post("/guardrails/ask", response_model=GuardrailsResponse, status_code=status.HTTP_200_OK)
+@profiled
 def ask_guardrails(req: GuardrailsRequest):
     """
     Executa a análise de guardrails e retorna JSON estruturado.
     """
     try:
-        # Por enquanto, analyze_guardrails usa o modelo padrão interno (creative_model).
-        # Os campos model_name/temperature ficam reservados para evolução.
-        out = analyze_guardrails(question=req.question)
+        from app.mirai_agents.models import get_model  # lazy import (exige API key)
+
+        decision = route_model("guardrails", req.question, model_name=req.model_name)
+        model = get_model(decision.model_name, req.temperature)
+        started = time.perf_counter()
+        out = analyze_guardrails(question=req.question, model=model)
+        record_route(decision, time.perf_counter() - started, len(req.question), len(str(out or "")))
 
         if not out:
             raise HTTPException(
@@ -0,0 +1,124 @@
+# app/routers/jobs.py
+import asyncio
+import json
+import os
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+from app.jobs import get_store
+
+router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
+
+# duração máxima de um /jobs/{id}/stream; o cliente reconecta se ainda quiser acompanhar
+STREAM_MAX_SECONDS = float(os.getenv("MIRAI_JOB_STREAM_MAX_SECONDS", "600"))
+
+
+class JobItem(BaseModel):
+    tema: str = Field(..., min_length=1, description="Tema da aula")
+    question: Optional[str] = Field(None, description="Solicitação específica do tema (usa a do job se omitida)")
+
+
+class JobRequest(BaseModel):
+    items: List[JobItem] = Field(..., min_length=1, max_length=500)
+    question: str = Field("Crie um plano de aula para o tema.", min_length=1, description="Solicitação padrão")
+    context_schema: Optional[str] = Field(None, description="Contexto educacional comum a todos os temas")
+    include_lesson: bool = Field(False, description="Também gera a aula do professor para cada plano")
+    mode: Literal["single", "sections"] = Field("single", description="Modo do professor (ver /professor/ask)")
+    model_name: Optional[str] = Field(None, description="Se omitido, escolhido pela política de roteamento")
+    temperature: float = Field(0.4, ge=0.0, le=1.0)
+
+
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    total: int
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    total: int
+    pending: int
+    running: int
+    done: int
+    failed: int
+    finished: bool
+    created_at: float
+
+
+class JobItemResult(BaseModel):
+    idx: int
+    tema: str
+    status: str
+    attempts: int
+    plan: Optional[str] = None
+    lesson: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobResultsResponse(BaseModel):
+    status: JobStatusResponse
+    items: List[JobItemResult]
+
+
+def _status_or_404(job_id: str) -> dict:
+    out = get_store().status(job_id)
+    if out is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return out
+
+
+@router.post("/jobs", response_model=JobSubmitResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_job(req: JobRequest, x_tenant_id: Optional[str] = Header(None)):
+    items = [{"tema": it.tema, "question": it.question or req.question} for it in req.items]
+    params = {
+        "context_schema": req.context_schema,
+        "include_lesson": req.include_lesson,
+        "mode": req.mode,
+        "model_name": req.model_name,
+        "temperature": req.temperature,
+        "tenant": x_tenant_id,  # cota/classe do tenant também vale para o lote
+    }
+    job_id = get_store().submit(items, params)
+    return JobSubmitResponse(job_id=job_id, total=len(items))
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+def job_status(job_id: str):
+    return JobStatusResponse(**_status_or_404(job_id))
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobResultsResponse)
+def job_results(job_id: str):
+    job = _status_or_404(job_id)
+    items = get_store().results(job_id)
+    return JobResultsResponse(status=JobStatusResponse(**job), items=[JobItemResult(**it) for it in items])
+
+
+@router.get("/jobs/{job_id}/stream")
+async def job_stream(job_id: str, interval: float = 2.0):
+    """
+    Progresso em NDJSON: uma linha de status sempre que mudar, até o job terminar
+    ou até MIRAI_JOB_STREAM_MAX_SECONDS (aí a última linha é {"timeout": true}).
+    Assíncrono para não prender uma thread do threadpool durante a espera.
+    """
+    await run_in_threadpool(_status_or_404, job_id)
+    interval = max(0.5, interval)
+
+    async def _lines():
+        deadline = asyncio.get_running_loop().time() + STREAM_MAX_SECONDS
+        last = None
+        while True:
+            current = await run_in_threadpool(get_store().status, job_id)
+            if current != last:
+                yield json.dumps(current) + "\n"
+                last = current
+            if current["finished"]:
+                break
+            if asyncio.get_running_loop().time() + interval > deadline:
+                yield json.dumps({"timeout": True}) + "\n"
+                break
+            await asyncio.sleep(interval)
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
@@ -0,0 +1,27 @@
+# app/routers/metrics.py
+import os
+from fastapi import APIRouter
+
+from app.mirai_agents.routing import routing_metrics
+from app.scheduler import scheduler
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/routing")
+def get_routing_metrics():
+    """
+    Latência e custo estimado por agente/tier/modelo (desde o start do worker).
+    O estado é por processo: os números são do worker que respondeu ("pid").
+    estimated_cost_usd fica null para modelos explícitos fora dos tiers (preço desconhecido).
+    """
+    return {"pid": os.getpid(), "workers": int(os.getenv("MIRAI_WORKERS", "1")), "routes": routing_metrics()}
+
+
+@router.get("/scheduler")
+def get_scheduler_metrics():
+    """
+    Tempo de espera na fila do upstream por classe de prioridade (média, p50, p99).
+    O estado é por processo: os números são do worker que respondeu ("pid").
+    """
+    return scheduler.metrics()
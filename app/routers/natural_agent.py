@@ -1,24 +1,58 @@
-from fastapi import APIRouter, HTTPException, status
+import functools
+import time
+from anyio import from_thread
+from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from app.mirai_agents.speaking_agent import FriendlyAgent  # agente que lê a key do .env
+from app.mirai_agents.routing import route_model, record_route
+from app.profiling import profiled
+from app.sql_context import SqlConfigError, SqlIdentityError, get_executor
 
 router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
 
 class AskRequest(BaseModel):
     question: str = Field(..., min_length=1)
-    model_name: str = Field("gemini-1.5-flash")
+    model_name: Optional[str] = Field(None, description="Se omitido, escolhido pela política de roteamento")
     temperature: float = Field(0.4, ge=0.0, le=1.0)
     context_sql: Optional[str] = Field(None, description="Contexto SQL adicional (opcional)")
+    classificacao_pergunta: Optional[str] = Field(None, description="Classificação do guardrails, se já disponível (usada no roteamento)")
+    query: Optional[str] = Field(None, description="Nome de uma consulta permitida, executada no servidor (conversa_com_query)")
+    query_params: Dict[str, Any] = Field(default_factory=dict, description="Parâmetros da consulta (escolhidos pelo cliente; identidade vem de bound_params/headers)")
 
 class AskResponse(BaseModel):
     answer: str
 
 @router.post("/natural/ask", response_model=AskResponse, status_code=status.HTTP_200_OK)
-def ask_natural(req: AskRequest):
+@profiled
+def ask_natural(req: AskRequest, request: Request):
+    context_sql = req.context_sql
+    if req.query:
+        try:
+            # rota síncrona roda no threadpool; a engine async vive no event loop.
+            # Headers alimentam os bound_params (identidade vinda do gateway, não do corpo)
+            server_ctx = from_thread.run(
+                functools.partial(get_executor().fetch_context, req.query, req.query_params,
+                                  headers=dict(request.headers))
+            )
+        except SqlIdentityError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        except ValueError as e:
+            # consulta fora da whitelist ou parâmetros inválidos: erro do cliente
+            raise HTTPException(status_code=400, detail=str(e))
+        except SqlConfigError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Falha ao executar a consulta: {e}")
+        context_sql = f"{context_sql.strip()}\n{server_ctx}" if context_sql else server_ctx
+
     try:
-        agent = FriendlyAgent(model_name=req.model_name, temperature=req.temperature)
-        answer = agent.respond(req.question, context_sql=req.context_sql)
+        prompt_text = req.question + (context_sql or "")
+        decision = route_model("natural", prompt_text, classificacao=req.classificacao_pergunta, model_name=req.model_name)
+        agent = FriendlyAgent(model_name=decision.model_name, temperature=req.temperature)
+        started = time.perf_counter()
+        answer = agent.respond(req.question, context_sql=context_sql)
+        record_route(decision, time.perf_counter() - started, len(prompt_text), len(answer or ""))
         if not answer:
             raise HTTPException(status_code=502, detail="Resposta vazia do agente.")
         return AskResponse(answer=answer)
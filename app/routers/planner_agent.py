@@ -1,8 +1,11 @@
+import time
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from app.mirai_agents.planner_agent import PlannerAgent
+from app.mirai_agents.routing import route_model, record_route
+from app.profiling import profiled
 
 router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
 
@@ -11,7 +14,7 @@ class PlannerRequest(BaseModel):
     question: str = Field(..., min_length=1, description="Solicitação de planejamento")
     tema: str = Field(..., min_length=1, description="Tema da aula")
     context_schema: Optional[str] = Field(None, description="Contexto opcional da última sessão")
-    model_name: str = Field("gemini-1.5-flash")
+    model_name: Optional[str] = Field(None, description="Se omitido, escolhido pela política de roteamento")
     temperature: float = Field(0.4, ge=0.0, le=1.0)
 
 
@@ -20,14 +23,19 @@ class PlannerResponse(BaseModel):
 
 
 @router.post("/planner/ask", response_model=PlannerResponse, status_code=status.HTTP_200_OK)
+@profiled
 def plan(req: PlannerRequest):
     try:
-        agent = PlannerAgent(model_name=req.model_name, temperature=req.temperature)
+        prompt_text = req.question + req.tema + (req.context_schema or "")
+        decision = route_model("planner", prompt_text, model_name=req.model_name)
+        agent = PlannerAgent(model_name=decision.model_name, temperature=req.temperature)
+        started = time.perf_counter()
         out = agent.plan(
             question=req.question,
             tema=req.tema,
             context_schema=req.context_schema  # ✅ consistente
         )
+        record_route(decision, time.perf_counter() - started, len(prompt_text), len(out or ""))
         if not out:
             raise HTTPException(status_code=502, detail="Saída vazia do planner.")
         return PlannerResponse(plan=out)
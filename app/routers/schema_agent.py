@@ -1,13 +1,17 @@
 # app/routers/schema_creator_router.py
+import time
+from typing import Optional
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from app.mirai_agents.schema_agent import SchemaAgent
+from app.mirai_agents.routing import route_model, record_route
+from app.profiling import profiled
 
 router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
 
 class EvaluationRequest(BaseModel):
     question: str = Field(..., min_length=1, description="Entrada com a fala ou contexto do estudante")
-    model_name: str = Field("gemini-1.5-flash")
+    model_name: Optional[str] = Field(None, description="Se omitido, escolhido pela política de roteamento")
     temperature: float = Field(0.2, ge=0.0, le=1.0)
 
 class EvaluationResponse(BaseModel):
@@ -21,10 +25,14 @@ def _as_str(v: object) -> str:
     return str(v).strip()
 
 @router.post("/schema_creator/ask", response_model=EvaluationResponse, status_code=status.HTTP_200_OK)
+@profiled
 def evaluate_student(req: EvaluationRequest):
     try:
-        agent = SchemaAgent(model_name=req.model_name, temperature=req.temperature)
+        decision = route_model("schema", req.question, model_name=req.model_name)
+        agent = SchemaAgent(model_name=decision.model_name, temperature=req.temperature)
+        started = time.perf_counter()
         raw = agent.evaluate(req.question)
+        record_route(decision, time.perf_counter() - started, len(req.question), sum(len(str(v)) for v in raw.values()))
 
         # blindagem final para o Pydantic não explodir
         answer = {
@@ -1,18 +1,35 @@
+import json
+import time
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel, Field
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Literal, Optional
 
 from app.mirai_agents.teacher_agent import TeacherAgent  # ajuste se o módulo tiver outro nome
+from app.mirai_agents.routing import route_model, record_route
+from app.profiling import profiled, profiled_iter
 
 router = APIRouter(prefix="/mirai_agents", tags=["mirai_agents"])
 
 
-class ProfessorRequest(BaseModel):
+class _ProfessorBase(BaseModel):
     question: str = Field(..., min_length=1, description="Pergunta do usuário ou tópico a ser ensinado")
     plan: str = Field(..., min_length=1, description="Plano de estudos a ser aplicado")
     context_schema: Optional[str] = Field(None, description="Contexto da última aula (opcional)")
-    model_name: str = Field("gemini-1.5-flash")
+    model_name: Optional[str] = Field(None, description="Se omitido, escolhido pela política de roteamento")
     temperature: float = Field(0.4, ge=0.0, le=1.0)
+    max_concurrency: int = Field(4, ge=1, le=16, description="Seções geradas simultaneamente (modo sections)")
+
+
+class ProfessorRequest(_ProfessorBase):
+    mode: Literal["single", "sections"] = Field(
+        "single", description="single = uma chamada; sections = esboço + seções em paralelo"
+    )
+
+
+class ProfessorStreamRequest(_ProfessorBase):
+    # o stream é sempre em seções; campos desconhecidos (ex.: mode) viram 422
+    model_config = ConfigDict(extra="forbid")
 
 
 class ProfessorResponse(BaseModel):
@@ -20,16 +37,58 @@ class ProfessorResponse(BaseModel):
 
 
 @router.post("/professor/ask", response_model=ProfessorResponse, status_code=status.HTTP_200_OK)
+@profiled
 def teach(req: ProfessorRequest):
     try:
-        agent = TeacherAgent(model_name=req.model_name, temperature=req.temperature)
-        output = agent.teach(
+        prompt_text = req.question + req.plan + (req.context_schema or "")
+        decision = route_model("professor", prompt_text, model_name=req.model_name)
+        agent = TeacherAgent(model_name=decision.model_name, temperature=req.temperature,
+                             max_concurrency=req.max_concurrency)
+        started = time.perf_counter()
+        teach_fn = agent.teach_sections if req.mode == "sections" else agent.teach
+        output = teach_fn(
             question=req.question,
             plan=req.plan,
             context_schema=req.context_schema  # ✅ agora vai pro template do Teacher
         )
+        record_route(decision, time.perf_counter() - started, len(prompt_text), len(output or ""))
         if not output:
             raise HTTPException(status_code=502, detail="Saída vazia do professor.")
         return ProfessorResponse(lesson=output)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Falha no professor: {e}")
+
+
+@router.post("/professor/ask/stream", status_code=status.HTTP_200_OK)
+@profiled
+def teach_stream(req: ProfessorStreamRequest):
+    """
+    Modo sections em streaming (NDJSON): primeiro uma linha com o esboço, depois
+    uma linha por seção assim que ela fica pronta ({"index", "title", "content"}).
+    O cliente monta a aula ordenando pelas posições do esboço.
+    """
+    try:
+        prompt_text = req.question + req.plan + (req.context_schema or "")
+        decision = route_model("professor", prompt_text, model_name=req.model_name)
+        agent = TeacherAgent(model_name=decision.model_name, temperature=req.temperature,
+                             max_concurrency=req.max_concurrency)
+        started = time.perf_counter()
+        titles = agent.outline(req.question, req.plan, req.context_schema)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Falha no professor: {e}")
+
+    def _lines():
+        yield json.dumps({"outline": titles}, ensure_ascii=False) + "\n"
+        output_chars = 0
+        try:
+            for index, title, content in agent.iter_sections(
+                req.question, req.plan, req.context_schema, titles=titles
+            ):
+                output_chars += len(content)
+                yield json.dumps({"index": index, "title": title, "content": content}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Falha no professor: {e}"}, ensure_ascii=False) + "\n"
+        finally:
+            record_route(decision, time.perf_counter() - started, len(prompt_text), output_chars)
+
+    return StreamingResponse(profiled_iter(_lines()), media_type="application/x-ndjson")
@@ -0,0 +1,439 @@
+# app/scheduler.py
+"""
+Agendamento por prioridade das chamadas ao Gemini.
+
+Todas as chamadas LLM dos agentes passam por `upstream_slot()`, que limita a
+concorrência e decide quem sai da fila primeiro:
+
+- classes de prioridade (interactive / bulk), atribuídas por endpoint e,
+  opcionalmente, por tenant (header X-Tenant-ID);
+- weighted fair queuing entre classes (pesos configuráveis);
+- capacidade reservada para a classe interactive (bulk nunca ocupa esses slots);
+- cota de chamadas simultâneas por tenant. Chamadas sem X-Tenant-ID contam
+  todas juntas como o tenant "anonymous" (omitir o header não escapa da cota).
+
+O serviço não autentica o X-Tenant-ID: quem manda o header escolhe a cota e a
+classe (tenant_classes) que vai usar. Em produção ele precisa ser definido (ou
+sobrescrito) por um gateway confiável na frente da API, nunca repassado do cliente.
+
+A classe/tenant da requisição corrente ficam em contextvars, preenchidos pelo
+PriorityMiddleware (rotas) ou por `priority_context()` (jobs em lote).
+
+As rotas síncronas rodam no threadpool do Starlette (40 threads por processo),
+e a espera em `upstream_slot()` prende a thread. Para requisições bulk em fila
+não tomarem todas as threads antes das interactive chegarem ao scheduler, o
+PriorityMiddleware faz uma admissão assíncrona por classe ("admission"): quem
+passa do limite espera no event loop, sem ocupar thread. Só as rotas listadas em
+"endpoints" (as que chamam o LLM) passam pela admissão; health, métricas, admin
+e consulta/stream de jobs seguem direto.
+
+Os limites do config valem para o deploy inteiro: o estado é em memória, por
+processo, então cada worker usa a sua fração (dividida por MIRAI_WORKERS, que o
+app/serving.py exporta). Pelo mesmo motivo /metrics/scheduler mostra só o worker
+que respondeu (campo "pid").
+
+Configuração: MIRAI_SCHEDULER_CONFIG aponta para um JSON com as mesmas chaves de
+DEFAULT_SCHEDULER_CONFIG (merge raso por chave). O arquivo é validado no import:
+classe desconhecida, peso <= 0 ou reserva que ocupa toda a capacidade falham no
+startup, não na requisição.
+"""
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+CLASSES = (INTERACTIVE, BULK)
+# tenant de quem não manda X-Tenant-ID (cota em tenant_quotas["anonymous"] ou tenant_max_concurrency)
+ANONYMOUS_TENANT = "anonymous"
+
+DEFAULT_SCHEDULER_CONFIG = {
+    # chamadas simultâneas ao upstream (deploy inteiro)
+    "capacity": 16,
+    # slots que só a classe interactive pode usar
+    "reserved": {INTERACTIVE: 4},
+    # peso no fair queuing (maior = mais vazão sob disputa)
+    "weights": {INTERACTIVE: 4, BULK: 1},
+    "endpoints": {
+        "/mirai_agents/natural/ask": INTERACTIVE,
+        "/mirai_agents/guardrails/ask": INTERACTIVE,
+        "/mirai_agents/schema_creator/ask": INTERACTIVE,
+        "/mirai_agents/planner/ask": BULK,
+        "/mirai_agents/professor/ask": BULK,
+        "/mirai_agents/professor/ask/stream": BULK,
+    },
+    # classe das chamadas LLM feitas fora de uma rota mapeada (só vale em upstream_slot)
+    "default_class": BULK,
+    # sobrescreve a classe por tenant (ex.: {"coordenacao": "bulk"})
+    "tenant_classes": {},
+    # chamadas simultâneas por tenant (0 = sem limite); tenant_quotas sobrescreve por tenant.
+    # Sem header o tenant é "anonymous": todo o tráfego anônimo divide uma cota só
+    "tenant_max_concurrency": 0,
+    "tenant_quotas": {},
+    # requisições simultâneas admitidas por classe (0/ausente = sem limite); bulk
+    # não ganha mais que os slots que pode usar no upstream (capacity - reserved)
+    "admission": {BULK: 12},
+    # espera máxima na fila antes de desistir (segundos)
+    "queue_timeout": 120.0,
+}
+
+TENANT_HEADER = "x-tenant-id"
+
+
+def validate_config(config: dict) -> dict:
+    """Confere tipos, classes e limites (valores do deploy, antes de per_process)."""
+    def _fail(msg: str):
+        raise ValueError(f"Config do scheduler: {msg}")
+
+    def _class(name: str, where: str) -> str:
+        if name not in CLASSES:
+            _fail(f"classe desconhecida '{name}' em {where} (válidas: {', '.join(CLASSES)}).")
+        return name
+
+    def _non_negative(value, where: str) -> int:
+        try:
+            n = int(value)
+        except (TypeError, ValueError):
+            n = -1
+        if n < 0:
+            _fail(f"{where} deve ser um inteiro >= 0.")
+        return n
+
+    missing = set(DEFAULT_SCHEDULER_CONFIG) - set(config)
+    if missing:
+        _fail(f"chaves ausentes {sorted(missing)}.")
+    config["capacity"] = _non_negative(config["capacity"], "capacity")
+    if config["capacity"] < 1:
+        _fail("capacity deve ser >= 1.")
+
+    weights = {}
+    for cls, w in config["weights"].items():
+        _class(cls, "weights")
+        try:
+            weights[cls] = float(w)
+        except (TypeError, ValueError):
+            weights[cls] = 0.0
+        if weights[cls] <= 0:
+            _fail(f"peso de '{cls}' deve ser > 0.")
+    config["weights"] = weights
+
+    for key in ("reserved", "admission"):
+        config[key] = {_class(cls, key): _non_negative(n, f"{key}.{cls}") for cls, n in config[key].items()}
+    if sum(config["reserved"].values()) >= config["capacity"]:
+        _fail("a soma de reserved deve ser menor que capacity.")
+
+    config["endpoints"] = {path.rstrip("/"): _class(cls, f"endpoints['{path}']") for path, cls in config["endpoints"].items()}
+    _class(config["default_class"], "default_class")
+    config["tenant_classes"] = {t: _class(cls, f"tenant_classes['{t}']") for t, cls in config["tenant_classes"].items()}
+    config["tenant_max_concurrency"] = _non_negative(config["tenant_max_concurrency"], "tenant_max_concurrency")
+    config["tenant_quotas"] = {t: _non_negative(n, f"tenant_quotas['{t}']") for t, n in config["tenant_quotas"].items()}
+    try:
+        config["queue_timeout"] = float(config["queue_timeout"])
+    except (TypeError, ValueError):
+        config["queue_timeout"] = 0.0
+    if config["queue_timeout"] <= 0:
+        _fail("queue_timeout deve ser > 0.")
+    return config
+
+
+def per_process(config: dict, workers: int) -> dict:
+    """Divide os limites do deploy entre `workers` processos (mínimo 1 onde havia limite)."""
+    def _share(n: int, round_up: bool = False) -> int:
+        if not n:
+            return 0
+        return max(1, math.ceil(n / workers) if round_up else n // workers)
+
+    config = dict(config)
+    config["capacity"] = _share(int(config["capacity"]))
+    config["reserved"] = {
+        cls: min(_share(int(n)), config["capacity"] - 1) for cls, n in config["reserved"].items()
+    }
+    config["admission"] = {cls: _share(int(n)) for cls, n in config.get("admission", {}).items()}
+    # cota de tenant arredonda para cima: um tenant pequeno não pode zerar
+    config["tenant_max_concurrency"] = _share(int(config["tenant_max_concurrency"]), round_up=True)
+    config["tenant_quotas"] = {t: _share(int(n), round_up=True) for t, n in config["tenant_quotas"].items()}
+    return config
+
+
+def _load_config() -> dict:
+    config = json.loads(json.dumps(DEFAULT_SCHEDULER_CONFIG))  # cópia profunda
+    path = os.getenv("MIRAI_SCHEDULER_CONFIG")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    return per_process(validate_config(config), max(1, int(os.getenv("MIRAI_WORKERS", "1"))))
+
+
+SCHEDULER_CONFIG = _load_config()
+
+_current_class: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("mirai_priority_class", default=None)
+_current_tenant: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("mirai_tenant", default=None)
+
+
+def classify(path: str, tenant: Optional[str] = None, config: Optional[dict] = None) -> Optional[str]:
+    """
+    Classe de uma rota que chama o LLM, ou None se o path não está em "endpoints"
+    (health, métricas, admin, consulta de jobs): essas não passam pela admissão.
+    """
+    config = config or SCHEDULER_CONFIG
+    if path.rstrip("/") not in config["endpoints"]:
+        return None
+    if tenant and tenant in config["tenant_classes"]:
+        return config["tenant_classes"][tenant]
+    return config["endpoints"][path.rstrip("/")]
+
+
+@contextmanager
+def priority_context(priority_class: str, tenant: Optional[str] = None) -> Iterator[None]:
+    """Define a classe/tenant das chamadas LLM feitas dentro do bloco."""
+    cls_token = _current_class.set(priority_class)
+    tenant_token = _current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _current_class.reset(cls_token)
+        _current_tenant.reset(tenant_token)
+
+
+class _Waiter:
+    __slots__ = ("priority_class", "tenant", "enqueued_at", "granted")
+
+    def __init__(self, priority_class: str, tenant: Optional[str]):
+        self.priority_class = priority_class
+        self.tenant = tenant or ANONYMOUS_TENANT
+        self.enqueued_at = time.perf_counter()
+        self.granted = False
+
+
+class UpstreamScheduler:
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config or SCHEDULER_CONFIG
+        self._cond = threading.Condition()
+        self._queues: dict[str, deque] = {}
+        self._vtime: dict[str, float] = {}
+        self._clock = 0.0
+        self._in_use = 0
+        self._in_use_by_class: Counter = Counter()
+        self._in_use_by_tenant: Counter = Counter()
+        self._waits: dict[str, deque] = {}
+        self._wait_totals: dict[str, list] = {}
+
+    # ---------- política ----------
+    def _tenant_limit(self, tenant: str) -> int:
+        return int(self.config["tenant_quotas"].get(tenant, self.config["tenant_max_concurrency"]))
+
+    def _class_has_room(self, priority_class: str) -> bool:
+        """Há slot livre para a classe sem invadir a reserva das outras?"""
+        free = self.config["capacity"] - self._in_use
+        still_reserved = sum(
+            max(0, n - self._in_use_by_class[cls])
+            for cls, n in self.config["reserved"].items()
+            if cls != priority_class
+        )
+        return free - still_reserved > 0
+
+    def _eligible(self, queue: deque) -> Optional[_Waiter]:
+        for w in queue:
+            limit = self._tenant_limit(w.tenant)
+            if not limit or self._in_use_by_tenant[w.tenant] < limit:
+                return w
+        return None
+
+    def _dispatch(self) -> None:
+        granted = False
+        while self._in_use < self.config["capacity"]:
+            best, best_tag = None, None
+            for cls, queue in self._queues.items():
+                if not queue or not self._class_has_room(cls):
+                    continue
+                w = self._eligible(queue)
+                if w is None:
+                    continue
+                tag = max(self._vtime.get(cls, 0.0), self._clock)
+                if best_tag is None or tag < best_tag:
+                    best, best_tag = w, tag
+            if best is None:
+                break
+            cls = best.priority_class
+            self._queues[cls].remove(best)
+            self._clock = best_tag
+            self._vtime[cls] = best_tag + 1.0 / float(self.config["weights"].get(cls, 1))
+            best.granted = True
+            self._in_use += 1
+            self._in_use_by_class[cls] += 1
+            self._in_use_by_tenant[best.tenant] += 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    # ---------- API ----------
+    def acquire(self, priority_class: str, tenant: Optional[str] = None) -> _Waiter:
+        w = _Waiter(priority_class, tenant)
+        deadline = w.enqueued_at + float(self.config["queue_timeout"])
+        with self._cond:
+            self._queues.setdefault(priority_class, deque()).append(w)
+            self._dispatch()
+            while not w.granted:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._queues[priority_class].remove(w)
+                    self._record_wait(priority_class, time.perf_counter() - w.enqueued_at)
+                    raise TimeoutError(f"Fila do upstream ({priority_class}) excedeu {self.config['queue_timeout']}s")
+                self._cond.wait(remaining)
+            self._record_wait(priority_class, time.perf_counter() - w.enqueued_at)
+        return w
+
+    def release(self, w: _Waiter) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._in_use_by_class[w.priority_class] -= 1
+            self._in_use_by_tenant[w.tenant] -= 1
+            self._dispatch()
+
+    # ---------- métricas ----------
+    def _record_wait(self, priority_class: str, wait_s: float) -> None:
+        self._waits.setdefault(priority_class, deque(maxlen=2048)).append(wait_s)
+        totals = self._wait_totals.setdefault(priority_class, [0, 0.0])
+        totals[0] += 1
+        totals[1] += wait_s
+
+    def metrics(self) -> dict:
+        def _pct(values: list, p: float) -> float:
+            return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+        with self._cond:
+            classes = {}
+            for cls, (count, total) in self._wait_totals.items():
+                recent = sorted(self._waits[cls])
+                classes[cls] = {
+                    "requests": count,
+                    "avg_wait_s": total / count if count else 0.0,
+                    "p50_wait_s": _pct(recent, 0.50),
+                    "p99_wait_s": _pct(recent, 0.99),
+                    "queued": len(self._queues.get(cls, ())),
+                    "in_use": self._in_use_by_class[cls],
+                }
+            return {
+                "pid": os.getpid(),
+                "workers": int(os.getenv("MIRAI_WORKERS", "1")),
+                "capacity": self.config["capacity"],
+                "in_use": self._in_use,
+                "classes": classes,
+                "admission": admission.metrics(),
+            }
+
+
+class AdmissionControl:
+    """
+    Limite de requisições simultâneas por classe, aguardado no event loop (antes
+    de a rota pegar uma thread do threadpool).
+    """
+
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config or SCHEDULER_CONFIG
+        self._limiters: dict[str, anyio.CapacityLimiter] = {}
+
+    def _limiter(self, priority_class: str) -> Optional[anyio.CapacityLimiter]:
+        limit = int(self.config.get("admission", {}).get(priority_class, 0))
+        if not limit:
+            return None
+        if priority_class not in self._limiters:
+            self._limiters[priority_class] = anyio.CapacityLimiter(limit)
+        return self._limiters[priority_class]
+
+    async def acquire(self, priority_class: str) -> Optional[anyio.CapacityLimiter]:
+        """Espera vaga; devolve o que passar para release(). TimeoutError após queue_timeout."""
+        limiter = self._limiter(priority_class)
+        if limiter is not None:
+            try:
+                with anyio.fail_after(float(self.config["queue_timeout"])):
+                    await limiter.acquire()
+            except TimeoutError:
+                raise TimeoutError(
+                    f"Fila de admissão ({priority_class}) excedeu {self.config['queue_timeout']}s"
+                ) from None
+        return limiter
+
+    @staticmethod
+    def release(limiter: Optional[anyio.CapacityLimiter]) -> None:
+        if limiter is not None:
+            limiter.release()
+
+    def metrics(self) -> dict:
+        out = {}
+        for cls, limiter in self._limiters.items():
+            stats = limiter.statistics()
+            out[cls] = {"limit": int(limiter.total_tokens), "in_flight": stats.borrowed_tokens,
+                        "waiting": stats.tasks_waiting}
+        return out
+
+
+scheduler = UpstreamScheduler()
+admission = AdmissionControl()
+
+
+@contextmanager
+def upstream_slot() -> Iterator[None]:
+    """Envolve uma chamada ao LLM: espera a vez na fila da classe corrente."""
+    priority_class = _current_class.get() or SCHEDULER_CONFIG["default_class"]
+    w = scheduler.acquire(priority_class, _current_tenant.get())
+    try:
+        yield
+    finally:
+        scheduler.release(w)
+
+
+class PriorityMiddleware:
+    """Atribui classe/tenant por endpoint + header X-Tenant-ID e aplica a admissão da classe."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tenant = Headers(scope=scope).get(TENANT_HEADER) or None
+        priority_class = classify(scope["path"], tenant)
+        if priority_class is None:
+            # rota que não chama o LLM: não ocupa vaga de admissão
+            await self.app(scope, receive, send)
+            return
+        try:
+            held = await admission.acquire(priority_class)
+        except TimeoutError as e:
+            await JSONResponse({"detail": str(e)}, status_code=503)(scope, receive, send)
+            return
+        try:
+            with priority_context(priority_class, tenant):
+                await self.app(scope, receive, send)
+        finally:
+            admission.release(held)
+
+
+__all__ = [
+    "INTERACTIVE",
+    "BULK",
+    "ANONYMOUS_TENANT",
+    "UpstreamScheduler",
+    "AdmissionControl",
+    "admission",
+    "per_process",
+    "validate_config",
+    "PriorityMiddleware",
+    "classify",
+    "priority_context",
+    "scheduler",
+    "upstream_slot",
+]
@@ -0,0 +1,71 @@
+# app/serving.py
+"""
+Configuração do modo de produção (multi-worker).
+
+Todos os valores vêm de variáveis de ambiente para poder ajustar o deploy
+sem mexer no código:
+
+- MIRAI_HOST / MIRAI_PORT
+- MIRAI_WORKERS              (padrão: nº de CPUs, no máximo 4)
+- MIRAI_MAX_REQUESTS         (reciclagem do worker após N requisições; 0 desliga)
+- MIRAI_MAX_REQUESTS_JITTER  (evita que todos os workers reciclem juntos)
+- MIRAI_GRACEFUL_TIMEOUT     (segundos para drenar chamadas LLM em andamento)
+- MIRAI_WORKER_TIMEOUT       (timeout de worker travado; deve ser > REQUEST_TIMEOUT_SECONDS)
+
+Atenção: vários limites são por processo e se multiplicam pelo número de
+workers: threads de jobs (MIRAI_JOB_WORKERS), pool SQL (MIRAI_SQL_POOL_SIZE +
+MIRAI_SQL_MAX_OVERFLOW) e o threadpool do Starlette. `worker_count()` exporta o
+valor resolvido em MIRAI_WORKERS antes da app ser importada, para quem precisar
+dividir um limite global (o scheduler do upstream já faz isso).
+"""
+import os
+import shutil
+import sys
+
+HOST = os.getenv("MIRAI_HOST", "0.0.0.0")
+PORT = int(os.getenv("MIRAI_PORT", "9200"))
+MAX_REQUESTS = int(os.getenv("MIRAI_MAX_REQUESTS", "1000"))
+MAX_REQUESTS_JITTER = int(os.getenv("MIRAI_MAX_REQUESTS_JITTER", "100"))
+GRACEFUL_TIMEOUT = int(os.getenv("MIRAI_GRACEFUL_TIMEOUT", "60"))
+WORKER_TIMEOUT = int(os.getenv("MIRAI_WORKER_TIMEOUT", "120"))
+
+
+def worker_count() -> int:
+    """
+    Quantidade de workers. As rotas passam a maior parte do tempo esperando o
+    Gemini (I/O), que já é concorrente dentro de cada worker (threadpool), então
+    não precisamos de 2 * CPUs + 1: um worker por CPU, no máximo 4, para não
+    multiplicar demais os limites por processo (ver docstring do módulo).
+
+    O valor resolvido é exportado em MIRAI_WORKERS para os módulos da app.
+    """
+    configured = os.getenv("MIRAI_WORKERS")
+    workers = max(1, int(configured)) if configured else min(os.cpu_count() or 1, 4)
+    os.environ["MIRAI_WORKERS"] = str(workers)
+    return workers
+
+
+def run(app_path: str = "main:app") -> None:
+    """
+    Sobe o servidor de produção.
+
+    Usa gunicorn + UvicornWorker quando disponível (preload da app, para os
+    workers compartilharem os módulos importados via copy-on-write). Em
+    ambientes sem gunicorn (ex.: Windows) cai para o multi-process do uvicorn,
+    que não faz preload mas mantém workers, reciclagem e drenagem.
+    """
+    gunicorn = shutil.which("gunicorn")
+    if gunicorn and sys.platform != "win32":
+        conf = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gunicorn.conf.py")
+        os.execv(gunicorn, [gunicorn, "-c", conf, app_path])
+
+    import uvicorn
+    uvicorn.run(
+        app_path,
+        host=HOST,
+        port=PORT,
+        workers=worker_count(),
+        limit_max_requests=MAX_REQUESTS or None,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
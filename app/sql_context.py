@@ -0,0 +1,268 @@
+# app/sql_context.py
+"""
+Executor de contexto SQL no servidor para o fluxo "conversa_com_query".
+
+Em vez do cliente rodar a consulta e mandar o resultado em context_sql, ele
+manda o NOME de uma consulta permitida + parâmetros. O serviço executa via
+engine SQLAlchemy assíncrona com pool, lê as linhas em streaming (para no
+limite de linhas), guarda em cache com TTL e serializa de forma compacta
+dentro de um orçamento de caracteres para o prompt.
+
+Só consultas de leitura declaradas no arquivo MIRAI_SQL_QUERIES (JSON) podem
+rodar, sempre com bind parameters:
+
+    {
+      "notas_do_aluno": {
+        "sql": "SELECT disciplina, nota FROM notas WHERE aluno_id = :aluno_id AND ano = :ano",
+        "params": ["ano"],                              # vêm do corpo (query_params)
+        "bound_params": {"aluno_id": "x-mirai-user-id"},  # vêm de header confiável
+        "max_rows": 50,          # opcional
+        "ttl": 60                # opcional (segundos)
+      }
+    }
+
+ATENÇÃO: a API não autentica o chamador. Tudo em "params" é escolhido por quem
+chama (query_params no corpo), então cada consulta só pode expor dados que
+QUALQUER cliente pode ver. Parâmetros que identificam o usuário (aluno_id,
+escola_id...) vão em "bound_params": o valor sai do header indicado, que deve
+ser definido (ou sobrescrito) por um gateway/autenticação confiável na frente da
+API; o cliente não consegue mandá-los no corpo. Sem o header a consulta é
+recusada (401).
+
+Configuração (env): MIRAI_SQL_URL (ex.: sqlite+aiosqlite:///./mirai.db,
+mysql+aiomysql://...), MIRAI_SQL_QUERIES, MIRAI_SQL_POOL_SIZE,
+MIRAI_SQL_MAX_OVERFLOW, MIRAI_SQL_TIMEOUT, MIRAI_SQL_MAX_ROWS,
+MIRAI_SQL_MAX_CHARS, MIRAI_SQL_CACHE_TTL, MIRAI_SQL_CACHE_SIZE.
+
+A whitelist é carregada e validada no startup (`init_executor`); arquivo
+inválido é erro de configuração do servidor (SqlConfigError -> 503), nunca 400.
+"""
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+SQL_URL = os.getenv("MIRAI_SQL_URL")
+SQL_QUERIES = os.getenv("MIRAI_SQL_QUERIES")
+SQL_POOL_SIZE = int(os.getenv("MIRAI_SQL_POOL_SIZE", "5"))
+SQL_MAX_OVERFLOW = int(os.getenv("MIRAI_SQL_MAX_OVERFLOW", "10"))
+SQL_TIMEOUT = float(os.getenv("MIRAI_SQL_TIMEOUT", "10"))
+SQL_MAX_ROWS = int(os.getenv("MIRAI_SQL_MAX_ROWS", "200"))
+SQL_MAX_CHARS = int(os.getenv("MIRAI_SQL_MAX_CHARS", "4000"))
+SQL_CACHE_TTL = float(os.getenv("MIRAI_SQL_CACHE_TTL", "60"))
+SQL_CACHE_SIZE = int(os.getenv("MIRAI_SQL_CACHE_SIZE", "512"))
+
+_READ_ONLY_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_MAX_CELL_CHARS = 200
+
+
+class SqlConfigError(RuntimeError):
+    """Configuração do contexto SQL ausente ou inválida (problema do servidor, não do cliente)."""
+
+
+class SqlIdentityError(PermissionError):
+    """Falta o header confiável de um parâmetro em bound_params."""
+
+
+@dataclass(frozen=True)
+class SqlQuery:
+    name: str
+    sql: str
+    params: tuple[str, ...]
+    # (parâmetro, header) preenchidos pelo servidor, nunca pelo corpo da requisição
+    bound_params: tuple[tuple[str, str], ...] = ()
+    max_rows: int = SQL_MAX_ROWS
+    ttl: float = SQL_CACHE_TTL
+
+
+def load_queries(path: Optional[str] = SQL_QUERIES) -> dict[str, SqlQuery]:
+    """
+    Carrega e valida a whitelist (só SELECT/WITH, uma instrução por consulta).
+    Qualquer problema no arquivo vira SqlConfigError.
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SqlConfigError(f"Não foi possível ler a whitelist SQL '{path}': {e}") from e
+    if not isinstance(raw, dict):
+        raise SqlConfigError(f"Whitelist SQL '{path}' deve ser um objeto {{nome: consulta}}.")
+
+    queries = {}
+    for name, spec in raw.items():
+        if not isinstance(spec, dict) or not isinstance(spec.get("sql"), str):
+            raise SqlConfigError(f"Consulta '{name}' sem 'sql'.")
+        sql = spec["sql"].strip().rstrip(";")
+        if not _READ_ONLY_RE.match(sql) or ";" in sql:
+            raise SqlConfigError(f"Consulta '{name}' não é uma leitura simples (SELECT/WITH).")
+        params = spec.get("params", [])
+        if not isinstance(params, list) or not all(isinstance(p, str) for p in params):
+            raise SqlConfigError(f"Consulta '{name}': 'params' deve ser uma lista de nomes.")
+        bound = spec.get("bound_params", {})
+        if not isinstance(bound, dict) or not all(isinstance(v, str) and v for v in bound.values()):
+            raise SqlConfigError(f"Consulta '{name}': 'bound_params' deve mapear parâmetro -> header.")
+        if set(bound) & set(params):
+            raise SqlConfigError(f"Consulta '{name}': {sorted(set(bound) & set(params))} em params e bound_params.")
+        try:
+            max_rows = int(spec.get("max_rows", SQL_MAX_ROWS))
+            ttl = float(spec.get("ttl", SQL_CACHE_TTL))
+        except (TypeError, ValueError) as e:
+            raise SqlConfigError(f"Consulta '{name}': max_rows/ttl inválidos ({e}).") from e
+        queries[name] = SqlQuery(
+            name=name,
+            sql=sql,
+            params=tuple(params),
+            bound_params=tuple((p, h.lower()) for p, h in bound.items()),
+            max_rows=max_rows,
+            ttl=ttl,
+        )
+    return queries
+
+
+def _cell(value: Any) -> str:
+    s = "" if value is None else str(value)
+    s = s.replace("\n", " ").replace("|", "/")
+    return s if len(s) <= _MAX_CELL_CHARS else s[: _MAX_CELL_CHARS - 1] + "…"
+
+
+def serialize_rows(columns: list[str], rows: list[tuple], truncated: bool, max_chars: int = SQL_MAX_CHARS) -> str:
+    """
+    Formato compacto para o prompt: cabeçalho + uma linha por registro separados
+    por "|". Para de adicionar linhas quando estoura o orçamento de caracteres.
+    """
+    lines = ["|".join(columns)]
+    used = len(lines[0])
+    shown = 0
+    for row in rows:
+        line = "|".join(_cell(v) for v in row)
+        if used + len(line) + 1 > max_chars:
+            break
+        lines.append(line)
+        used += len(line) + 1
+        shown += 1
+    omitted = len(rows) - shown
+    if truncated:
+        lines.append("... (mais linhas omitidas)")
+    elif omitted:
+        lines.append(f"... ({omitted} linhas omitidas)")
+    return "\n".join(lines)
+
+
+class SqlContextExecutor:
+    def __init__(self, url: str, queries: dict[str, SqlQuery]):
+        self.url = url
+        self.queries = queries
+        self._engine: Optional[AsyncEngine] = None
+        self._cache: TTLCache = TTLCache(maxsize=SQL_CACHE_SIZE, ttl=SQL_CACHE_TTL)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            kwargs: dict[str, Any] = {"pool_pre_ping": True}
+            if not self.url.startswith("sqlite"):
+                kwargs.update(pool_size=SQL_POOL_SIZE, max_overflow=SQL_MAX_OVERFLOW, pool_recycle=1800)
+            self._engine = create_async_engine(self.url, **kwargs)
+        return self._engine
+
+    def _bind(self, query: SqlQuery, params: dict[str, Any], headers: Mapping[str, str]) -> dict[str, Any]:
+        # parâmetros de bound_params mandados no corpo caem em "não permitidos"
+        missing = set(query.params) - set(params)
+        extra = set(params) - set(query.params)
+        if missing or extra:
+            raise ValueError(
+                f"Parâmetros inválidos para '{query.name}': faltando {sorted(missing)}, não permitidos {sorted(extra)}"
+            )
+        for k, v in params.items():
+            if v is not None and not isinstance(v, (str, int, float, bool)):
+                raise ValueError(f"Parâmetro '{k}' deve ser escalar.")
+        bound = dict(params)
+        for param, header in query.bound_params:
+            value = headers.get(header)
+            if not value:
+                raise SqlIdentityError(f"Consulta '{query.name}' exige o header {header}.")
+            bound[param] = value
+        return bound
+
+    async def _run(self, query: SqlQuery, params: dict[str, Any]) -> tuple[list[str], list[tuple], bool]:
+        async with self.engine.connect() as conn:
+            result = await conn.stream(text(query.sql), params)
+            columns = list(result.keys())
+            rows, truncated = [], False
+            async for row in result:
+                if len(rows) >= query.max_rows:
+                    truncated = True
+                    break
+                rows.append(tuple(row))
+            await result.close()
+        return columns, rows, truncated
+
+    async def fetch_context(self, name: str, params: Optional[dict[str, Any]] = None,
+                            max_chars: int = SQL_MAX_CHARS, headers: Optional[Mapping[str, str]] = None) -> str:
+        """
+        Executa a consulta permitida `name` e devolve o texto pronto para o prompt.
+        `params` vem do cliente; `headers` (nomes em minúsculas) alimenta bound_params.
+        """
+        query = self.queries.get(name)
+        if query is None:
+            raise ValueError(f"Consulta '{name}' não está na lista permitida.")
+        bound = self._bind(query, params or {}, headers or {})
+
+        key = (name, tuple(sorted(bound.items())))
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > asyncio.get_running_loop().time():
+            columns, rows, truncated = cached[1]
+        else:
+            columns, rows, truncated = await asyncio.wait_for(self._run(query, bound), timeout=SQL_TIMEOUT)
+            # TTL por consulta (o TTLCache aplica o teto global)
+            self._cache[key] = (asyncio.get_running_loop().time() + query.ttl, (columns, rows, truncated))
+
+        return serialize_rows(columns, rows, truncated, max_chars=max_chars)
+
+    async def dispose(self) -> None:
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+_executor: Optional[SqlContextExecutor] = None
+
+
+def get_executor() -> SqlContextExecutor:
+    global _executor
+    if _executor is None:
+        if not SQL_URL:
+            raise SqlConfigError("MIRAI_SQL_URL não configurada; contexto SQL no servidor indisponível.")
+        _executor = SqlContextExecutor(SQL_URL, load_queries(SQL_QUERIES))
+    return _executor
+
+
+def init_executor() -> None:
+    """Startup: com MIRAI_SQL_URL definida, carrega a whitelist já (config inválida impede o boot)."""
+    if SQL_URL:
+        get_executor()
+
+
+async def dispose_executor() -> None:
+    if _executor is not None:
+        await _executor.dispose()
+
+
+__all__ = [
+    "SqlConfigError",
+    "SqlIdentityError",
+    "SqlQuery",
+    "SqlContextExecutor",
+    "load_queries",
+    "serialize_rows",
+    "get_executor",
+    "init_executor",
+    "dispose_executor",
+]
@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+# Uso: gunicorn -c gunicorn.conf.py main:app   (ou MIRAI_ENV=production python main.py)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.serving import (  # noqa: E402
+    GRACEFUL_TIMEOUT,
+    HOST,
+    MAX_REQUESTS,
+    MAX_REQUESTS_JITTER,
+    PORT,
+    WORKER_TIMEOUT,
+    worker_count,
+)
+
+bind = f"{HOST}:{PORT}"
+# antes do preload: a app lê MIRAI_WORKERS para dividir limites globais
+workers = worker_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Importa main:app uma vez no master; os workers herdam via fork (copy-on-write)
+preload_app = True
+
+# Recicla workers periodicamente (contém vazamentos de memória do SDK/LangChain)
+max_requests = MAX_REQUESTS
+max_requests_jitter = MAX_REQUESTS_JITTER
+
+# SIGTERM: para de aceitar conexões e espera as chamadas LLM em andamento terminarem
+graceful_timeout = GRACEFUL_TIMEOUT
+timeout = WORKER_TIMEOUT
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
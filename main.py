@@ -6,8 +6,16 @@ from pathlib import Path
 # Carrega .env cedo (antes de importar a app)
 load_dotenv(Path(".env"), override=True)
 
+import inspect
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from app.compression import CompressionMiddleware
+from app.scheduler import PriorityMiddleware
+from app.profiling import ADMIN_TOKEN, PROFILING_ENABLED, ProfilingMiddleware
 
 # Routers
 from app.routers.natural_agent import router as natural_router
@@ -15,11 +23,22 @@ from app.routers.guardrails_agent import router as guardrails_router
 from app.routers.planner_agent import router as planner_router
 from app.routers.teacher_agent import router as professor_router
 from app.routers.schema_agent import router as schema_agent_router
+from app.routers.metrics import router as metrics_router
+from app.routers.jobs import router as jobs_router
+from app.routers.admin import router as admin_router
+from app.jobs import start_workers, stop_workers
+from app.sql_context import dispose_executor, init_executor
+
+# FastAPI recente serializa o response_model direto via Pydantic (empata ou ganha do
+# orjson, ver scripts/bench_compression.py); nas versões antigas o JSONResponse
+# passa por json.dumps e o orjson é 3-5x mais barato nas aulas/planos.
+_FAST_PYDANTIC_JSON = "dump_json" in inspect.signature(serialize_response).parameters
 
 app = FastAPI(
     title="Mirai Agents API",
     version="1.0.0",
-    description="API para orquestrar agentes do projeto Mirai"
+    description="API para orquestrar agentes do projeto Mirai",
+    default_response_class=JSONResponse if _FAST_PYDANTIC_JSON else ORJSONResponse,
 )
 
 # Configuração de CORS (ajuste allow_origins em produção!)
@@ -31,12 +50,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Classe de prioridade (interactive/bulk) e tenant das chamadas ao Gemini
+app.add_middleware(PriorityMiddleware)
+
+# Profiling por requisição (só registrado com MIRAI_PROFILING=1; ver app/profiling.py)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Compressão gzip/zstd negociada por Accept-Encoding (ver app/compression.py)
+app.add_middleware(CompressionMiddleware)
+
 # Registro dos routers
 app.include_router(natural_router)
 app.include_router(guardrails_router)
 app.include_router(planner_router)
 app.include_router(professor_router)
 app.include_router(schema_agent_router)
+app.include_router(metrics_router)
+app.include_router(jobs_router)
+# Rotas de admin (perfis) só existem com profiling ligado e token configurado
+if PROFILING_ENABLED and ADMIN_TOKEN:
+    app.include_router(admin_router)
+elif PROFILING_ENABLED:
+    print("[PROFILING] MIRAI_ADMIN_TOKEN não definido: /admin/profiles desativado, header X-Mirai-Profile "
+          "ignorado e amostragem (MIRAI_PROFILE_SAMPLE_RATE) desligada.")
+
+# Workers dos jobs em lote sobem por processo (depois do fork no modo produção)
+@app.on_event("startup")
+def _start_job_workers():
+    start_workers()
+
+@app.on_event("shutdown")
+def _stop_job_workers():
+    stop_workers()
+
+# Whitelist do contexto SQL validada no boot, não na primeira requisição
+@app.on_event("startup")
+def _load_sql_context():
+    init_executor()
+
+# Fecha o pool da engine SQL (contexto de /natural/ask)
+@app.on_event("shutdown")
+async def _dispose_sql_engine():
+    await dispose_executor()
 
 # Endpoint de healthcheck
 @app.get("/health", tags=["health"])
@@ -44,5 +100,12 @@ def health():
     return {"status": "ok"}
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="127.0.0.1", port=9200, reload=True)
+    import os
+
+    # MIRAI_ENV=production -> multi-worker com preload e drenagem (ver app/serving.py)
+    if os.getenv("MIRAI_ENV", "development").lower() == "production":
+        from app.serving import run
+        run("main:app")
+    else:
+        import uvicorn
+        uvicorn.run("main:app", host="127.0.0.1", port=9200, reload=True)
@@ -0,0 +1,110 @@
+# scripts/bench_compression.py
+"""
+Bytes no fio e CPU de serialização por endpoint, com o Gemini falso de
+scripts/fake_app.py (respostas do tamanho de uma aula/plano reais).
+
+Uso: MIRAI_FAKE_OUTPUT_CHARS=6000 python scripts/bench_compression.py [--iterations 2000]
+
+Para cada endpoint:
+- identity/gzip/zstd: tamanho do corpo como sai do CompressionMiddleware;
+- CPU por resposta da serialização do response_model como o FastAPI faz
+  (fastapi.routing.serialize_response + render):
+    json_us      JSONResponse clássico (dump em python + json.dumps);
+    pydantic_us  caminho direto Pydantic -> bytes do FastAPI recente (se existir);
+    orjson_us    ORJSONResponse (dump em python + orjson).
+A app usa o caminho Pydantic quando o FastAPI instalado tem, senão orjson.
+
+O texto falso é repetitivo, então as taxas de compressão ficam otimistas;
+para números reais, rode contra respostas capturadas do Gemini.
+"""
+import argparse
+import asyncio
+import contextlib
+import inspect
+import io
+import os
+import sys
+import time
+
+os.environ.setdefault("MIRAI_FAKE_LATENCY", "0")
+os.environ.setdefault("MIRAI_JOB_WORKERS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import APIRoute, serialize_response  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from scripts.fake_app import app  # noqa: E402
+from app.routers import guardrails_agent, natural_agent, planner_agent, schema_agent, teacher_agent  # noqa: E402
+from app.routers.natural_agent import AskResponse  # noqa: E402
+from app.routers.planner_agent import PlannerResponse  # noqa: E402
+from app.routers.teacher_agent import ProfessorResponse  # noqa: E402
+from app.routers.schema_agent import EvaluationResponse  # noqa: E402
+from app.routers.guardrails_agent import GuardrailsResponse  # noqa: E402
+
+ROUTERS = [natural_agent.router, guardrails_agent.router, schema_agent.router, planner_agent.router, teacher_agent.router]
+
+ENDPOINTS = [
+    ("/mirai_agents/natural/ask", {"question": "Oi, tudo bem?"}, AskResponse),
+    ("/mirai_agents/guardrails/ask", {"question": "Oi, tudo bem?"}, GuardrailsResponse),
+    ("/mirai_agents/schema_creator/ask", {"question": "sou bom em álgebra"}, EvaluationResponse),
+    ("/mirai_agents/planner/ask", {"question": "Monte um plano", "tema": "Normalização"}, PlannerResponse),
+    ("/mirai_agents/professor/ask", {"question": "Normalização", "plan": "1FN, 2FN, 3FN"}, ProfessorResponse),
+]
+
+
+_HAS_DUMP_JSON = "dump_json" in inspect.signature(serialize_response).parameters
+
+
+def _cpu_us(make_coro, iterations: int) -> float:
+    async def _run():
+        for _ in range(iterations):
+            await make_coro()
+
+    asyncio.run(_run())  # aquecimento
+    started = time.process_time()
+    asyncio.run(_run())
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def _serializers(field, payload):
+    async def as_json():
+        return JSONResponse(await serialize_response(field=field, response_content=payload)).body
+
+    async def as_orjson():
+        return ORJSONResponse(await serialize_response(field=field, response_content=payload)).body
+
+    async def as_pydantic():
+        return await serialize_response(field=field, response_content=payload, dump_json=True)
+
+    return as_json, as_pydantic if _HAS_DUMP_JSON else None, as_orjson
+
+
+def _wire_bytes(client: TestClient, path: str, body: dict, encoding: str) -> int:
+    with contextlib.redirect_stdout(io.StringIO()), client.stream("POST", path, json=body, headers={"Accept-Encoding": encoding}) as r:
+        r.raise_for_status()
+        return sum(len(chunk) for chunk in r.iter_raw())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    fields = {r.path: r.response_field for router in ROUTERS for r in router.routes if isinstance(r, APIRoute)}
+    print(f"{'endpoint':<24} {'identity':>8} {'gzip':>6} {'zstd':>6} {'json_us':>8} {'pydantic_us':>11} {'orjson_us':>9}")
+    for path, body, model in ENDPOINTS:
+        sizes = [_wire_bytes(client, path, body, enc) for enc in ("identity", "gzip", "zstd")]
+        with contextlib.redirect_stdout(io.StringIO()):  # agentes logam prompts em stdout
+            payload = model(**client.post(path, json=body).json())
+        timings = [
+            f"{_cpu_us(fn, args.iterations):.1f}" if fn else "n/a"
+            for fn in _serializers(fields[path], payload)
+        ]
+        name = path.replace("/mirai_agents", "")
+        print(f"{name:<24} {sizes[0]:>8} {sizes[1]:>6} {sizes[2]:>6} {timings[0]:>8} {timings[1]:>11} {timings[2]:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# scripts/bench_scheduler.py
+"""
+Teste de carga do scheduler via HTTP: latência das rotas interactive sozinhas e
+sob carga bulk, com e sem a admissão por classe (ver app/scheduler.py).
+
+Uso: python scripts/bench_scheduler.py [--bulk-clients 120] [--interactive-clients 8] [--requests 200]
+
+Sobe `uvicorn scripts.fake_app:app` (1 worker, Gemini falso com MIRAI_FAKE_LATENCY)
+uma vez por cenário de config e mede /mirai_agents/natural/ask (interactive)
+enquanto clientes em loop martelam /mirai_agents/planner/ask (bulk).
+"""
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scripts.bench_serving import _wait_ready  # noqa: E402
+
+SCENARIOS = {
+    "admissao": {},                 # config padrão (admission bulk limitada)
+    "sem_admissao": {"admission": {}},
+}
+
+
+def _start(port: int, overrides: dict, latency: float) -> tuple[subprocess.Popen, str]:
+    fd, conf = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(overrides, f)
+    env = dict(os.environ, MIRAI_SCHEDULER_CONFIG=conf, MIRAI_FAKE_LATENCY=str(latency),
+               MIRAI_FAKE_OUTPUT_CHARS="500", MIRAI_WORKERS="1",
+               MIRAI_JOB_WORKERS="0", MIRAI_JOBS_DB=os.path.join(ROOT, ".bench_jobs.db"))
+    cmd = [sys.executable, "-m", "uvicorn", "scripts.fake_app:app", "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning", "--no-access-log"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return proc, conf
+
+
+def _interactive(base: str, total: int, concurrency: int) -> dict:
+    body = {"question": "O que é uma chave estrangeira?"}
+    with httpx.Client(timeout=300, limits=httpx.Limits(max_connections=concurrency)) as client:
+        def _one(_):
+            t0 = time.perf_counter()
+            client.post(f"{base}/mirai_agents/natural/ask", json=body).raise_for_status()
+            return time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(_one, range(total)))
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+    }
+
+
+def _bulk(base: str, clients: int, stop: threading.Event, done: list) -> list[threading.Thread]:
+    body = {"question": "Monte um plano de estudos.", "tema": "Normalização"}
+
+    def _loop():
+        with httpx.Client(timeout=300) as client:
+            while not stop.is_set():
+                if client.post(f"{base}/mirai_agents/planner/ask", json=body).status_code == 200:
+                    done.append(1)
+
+    threads = [threading.Thread(target=_loop, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bulk-clients", type=int, default=120)
+    parser.add_argument("--interactive-clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=9360)
+    args = parser.parse_args()
+    base = f"http://127.0.0.1:{args.port}"
+
+    print(f"{'cenario':>13} {'carga':>6} {'p50_ms':>8} {'p99_ms':>8} {'bulk_rps':>9}")
+    for name, overrides in SCENARIOS.items():
+        proc, conf = _start(args.port, overrides, args.latency)
+        try:
+            _wait_ready(base)
+            _interactive(base, 20, args.interactive_clients)  # aquecimento
+            alone = _interactive(base, args.requests, args.interactive_clients)
+            print(f"{name:>13} {'-':>6} {alone['p50_ms']:>8.1f} {alone['p99_ms']:>8.1f} {'-':>9}")
+
+            stop, done = threading.Event(), []
+            threads = _bulk(base, args.bulk_clients, stop, done)
+            time.sleep(2)  # deixa a fila bulk encher
+            started, before = time.perf_counter(), len(done)
+            loaded = _interactive(base, args.requests, args.interactive_clients)
+            bulk_rps = (len(done) - before) / (time.perf_counter() - started)
+            stop.set()
+            for t in threads:
+                t.join(timeout=30)
+            print(f"{name:>13} {'bulk':>6} {loaded['p50_ms']:>8.1f} {loaded['p99_ms']:>8.1f} {bulk_rps:>9.1f}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=60)
+            os.unlink(conf)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# scripts/bench_serving.py
+"""
+Benchmark de startup e vazão: 1 worker vs N workers (modo produção), com o
+Gemini falso de scripts/fake_app.py.
+
+Uso: python scripts/bench_serving.py [--workers 1 4] [--requests 400] [--concurrency 64]
+
+Para cada contagem de workers sobe `gunicorn -c gunicorn.conf.py scripts.fake_app:app`
+(ou uvicorn --workers se não houver gunicorn), mede o tempo até /health
+responder e dispara requisições concorrentes em /mirai_agents/natural/ask.
+"""
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _start(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, MIRAI_WORKERS=str(workers), MIRAI_PORT=str(port), MIRAI_HOST="127.0.0.1",
+               MIRAI_JOB_WORKERS="0", MIRAI_JOBS_DB=os.path.join(ROOT, ".bench_jobs.db"))
+    if shutil.which("gunicorn"):
+        cmd = ["gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null", "scripts.fake_app:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "scripts.fake_app:app", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(base: str, timeout: float = 60.0) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(f"{base}/health", timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("servidor não subiu")
+
+
+def _load(base: str, total: int, concurrency: int) -> dict:
+    body = {"question": "Explique normalização de banco de dados com exemplos."}
+
+    with httpx.Client(timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        def _one(_):
+            t0 = time.perf_counter()
+            r = client.post(f"{base}/mirai_agents/natural/ask", json=body)
+            r.raise_for_status()
+            return time.perf_counter() - t0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(_one, range(total)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=9350)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'startup_s':>9} {'rps':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    for workers in args.workers:
+        proc = _start(workers, args.port)
+        base = f"http://127.0.0.1:{args.port}"
+        try:
+            startup = _wait_ready(base)
+            _load(base, min(50, args.requests), args.concurrency)  # aquecimento
+            out = _load(base, args.requests, args.concurrency)
+            print(f"{workers:>7} {startup:>9.2f} {out['rps']:>8.1f} {out['p50_ms']:>8.1f} {out['p99_ms']:>8.1f}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=90)
+
+
+if __name__ == "__main__":
+    main()
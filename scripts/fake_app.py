@@ -0,0 +1,47 @@
+# scripts/fake_app.py
+"""
+A app real (main:app) com o Gemini trocado por um modelo falso, para benchmarks.
+
+Uso: gunicorn -c gunicorn.conf.py scripts.fake_app:app
+     uvicorn scripts.fake_app:app
+
+- MIRAI_FAKE_LATENCY       (segundos de "espera pelo upstream" por chamada; padrão 0.05)
+- MIRAI_FAKE_OUTPUT_CHARS  (tamanho da resposta; padrão 4000, como uma aula em markdown)
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+import langchain_google_genai  # noqa: E402
+from langchain.schema import AIMessage  # noqa: E402
+
+FAKE_LATENCY = float(os.getenv("MIRAI_FAKE_LATENCY", "0.05"))
+FAKE_OUTPUT_CHARS = int(os.getenv("MIRAI_FAKE_OUTPUT_CHARS", "4000"))
+
+_LESSON = "## Seção\n\nConteúdo da aula com **markdown** e exemplos práticos. "
+_GUARDRAILS_JSON = '{"pergunta_nocisva": false, "pergunta_origem": "", "classificacao_pergunta": "conversa_sem_query"}'
+
+
+class FakeGemini:
+    """Mesma interface usada pelos agentes (construtor com kwargs + invoke)."""
+
+    def __init__(self, **kwargs):
+        self.model = kwargs.get("model")
+
+    def invoke(self, messages):
+        time.sleep(FAKE_LATENCY)
+        prompt = messages[-1].content
+        if "SAFETY OUTPUT" in prompt:
+            return AIMessage(content=_GUARDRAILS_JSON)
+        if "strong_points" in prompt:
+            return AIMessage(content='{"strong_points": "a", "weak_points": "b", "general_comments": "c"}')
+        return AIMessage(content=(_LESSON * (FAKE_OUTPUT_CHARS // len(_LESSON) + 1))[:FAKE_OUTPUT_CHARS])
+
+
+# precisa acontecer antes dos agentes importarem ChatGoogleGenerativeAI
+langchain_google_genai.ChatGoogleGenerativeAI = FakeGemini
+
+from main import app  # noqa: E402,F401
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Os agentes exigem uma key no __post_init__; nos testes o LLM é sempre falso
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("MIRAI_JOB_WORKERS", "0")
+os.environ.setdefault("MIRAI_JOBS_DB", os.path.join(tempfile.mkdtemp(), "jobs.db"))
@@ -0,0 +1,60 @@
+import gzip
+
+import pytest
+import zstandard
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.testclient import TestClient
+
+from app.compression import CompressionMiddleware, negotiate_encoding
+
+BIG = "aula " * 1000
+
+
+def _client() -> TestClient:
+    app = Starlette()
+    app.add_route("/small", lambda r: PlainTextResponse("ok"))
+    app.add_route("/big", lambda r: PlainTextResponse(BIG))
+    app.add_route("/stream", lambda r: StreamingResponse(iter([BIG[:2000], BIG[2000:]]), media_type="text/plain"))
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def _raw(client: TestClient, path: str, accept: str):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept}) as r:
+        return r.headers, b"".join(r.iter_raw())
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("gzip, zstd", "zstd"),
+    ("gzip", "gzip"),
+    ("zstd;q=0, gzip", "gzip"),
+    ("gzip;q=0.5, zstd;q=0.4", "gzip"),
+    ("*", "zstd"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+def test_big_response_is_compressed_with_length():
+    headers, body = _raw(_client(), "/big", "gzip")
+    assert headers["content-encoding"] == "gzip"
+    assert int(headers["content-length"]) == len(body)
+    assert gzip.decompress(body).decode() == BIG
+
+
+def test_streaming_response_is_compressed_per_chunk():
+    headers, body = _raw(_client(), "/stream", "zstd")
+    assert headers["content-encoding"] == "zstd"
+    assert "content-length" not in headers
+    out = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    assert out.decode() == BIG
+
+
+@pytest.mark.parametrize("path,accept", [("/small", "gzip"), ("/big", "identity")])
+def test_uncompressed_responses_still_vary_on_accept_encoding(path, accept):
+    headers, _ = _raw(_client(), path, accept)
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import jobs
+from app.jobs import JobStore, JobWorkerPool
+from app.routers import jobs as jobs_router
+
+PARAMS = {"temperature": 0.4}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.1)
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 2)
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def _submit(store, n=1):
+    return store.submit([{"tema": f"tema {i}", "question": "q"} for i in range(n)], PARAMS)
+
+
+def test_stale_worker_cannot_overwrite_reclaimed_item(store):
+    job_id = _submit(store)
+    slow = store.claim()
+    time.sleep(0.15)  # lease do worker lento vence
+    fast = store.claim()
+    assert fast is not None and fast["lease"] != slow["lease"]
+
+    assert store.complete(fast["job_id"], fast["idx"], fast["lease"], "plano novo", None)
+    # o worker lento termina depois: não pode sobrescrever nem reagendar
+    assert not store.complete(slow["job_id"], slow["idx"], slow["lease"], "plano velho", None)
+    assert not store.fail(slow["job_id"], slow["idx"], slow["lease"], slow["attempts"], "erro")
+    assert not store.renew(slow["job_id"], slow["idx"], slow["lease"])
+
+    [item] = store.results(job_id)
+    assert item["status"] == "done" and item["plan"] == "plano novo"
+
+
+def test_renew_keeps_item_from_being_reclaimed(store):
+    _submit(store)
+    item = store.claim()
+    for _ in range(3):
+        time.sleep(0.05)
+        assert store.renew(item["job_id"], item["idx"], item["lease"])
+    assert store.claim() is None
+
+
+def test_expired_lease_on_last_attempt_marks_failed(store):
+    job_id = _submit(store)
+    for _ in range(2):  # JOB_MAX_ATTEMPTS claims, todos "morrem" sem complete/fail
+        assert store.claim() is not None
+        time.sleep(0.15)
+    assert store.claim() is None
+
+    [item] = store.results(job_id)
+    assert item["status"] == "failed" and item["attempts"] == 2
+    assert store.status(job_id)["finished"]
+
+
+def test_worker_renews_lease_while_processing(store, monkeypatch):
+    job_id = _submit(store)
+    started = threading.Event()
+
+    def slow_process(item):
+        started.set()
+        time.sleep(0.35)  # bem mais que o lease de 0.1s
+        return "plano", None
+
+    monkeypatch.setattr(jobs, "process_item", slow_process)
+    pool = JobWorkerPool(store, workers=1)
+    pool.start()
+    try:
+        assert started.wait(2)
+        time.sleep(0.15)
+        assert store.claim() is None  # lease renovado: ninguém retoma
+        deadline = time.time() + 3
+        while not store.status(job_id)["finished"] and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        pool.stop(timeout=2)
+
+    [item] = store.results(job_id)
+    assert item["status"] == "done" and item["attempts"] == 1
+
+
+def test_job_stream_stops_after_max_duration(store, monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(jobs_router, "get_store", lambda: store)
+    monkeypatch.setattr(jobs_router, "STREAM_MAX_SECONDS", 1.0)
+    job_id = _submit(store)  # nenhum worker processa
+
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        resp = client.get(f"/mirai_agents/jobs/{job_id}/stream", params={"interval": 0.5})
+    lines = [json.loads(line) for line in resp.text.splitlines()]
+
+    assert time.perf_counter() - started < 3
+    assert lines[0]["pending"] == 1
+    assert lines[-1] == {"timeout": True}
+
+
+def test_job_request_limits():
+    from main import app
+
+    client = TestClient(app)
+    assert client.post("/mirai_agents/jobs", json={"items": []}).status_code == 422
+    items = [{"tema": "t"}] * 501
+    assert client.post("/mirai_agents/jobs", json={"items": items}).status_code == 422
@@ -0,0 +1,132 @@
+import contextvars
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app import profiling
+
+TOKEN = "segredo"
+
+
+class Body(BaseModel):
+    text: str
+
+
+def _marker_handler(text):
+    return text.upper()
+
+
+def _marker_pool(text):
+    return text[::-1]
+
+
+def _marker_stream(i):
+    return f"{i}\n"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware, sample_rate=0)
+
+    @app.post("/ask")
+    @profiling.profiled
+    def ask(body: Body):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            # mesmo padrão do TeacherAgent: contexto copiado + profile_thread na thread do pool
+            def _work():
+                with profiling.profile_thread():
+                    return _marker_pool(body.text)
+
+            reversed_text = pool.submit(contextvars.copy_context().run, _work).result()
+        return {"text": _marker_handler(body.text), "reversed": reversed_text}
+
+    @app.get("/stream")
+    def stream():
+        def _lines():
+            for i in range(3):
+                yield _marker_stream(i)
+
+        return StreamingResponse(profiling.profiled_iter(_lines()), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def _functions(path):
+    return {name for (_, _, name) in pstats.Stats(str(path)).stats}
+
+
+def test_profile_covers_event_loop_handler_and_pool_threads(client, tmp_path):
+    resp = client.post("/ask", json={"text": "abc"},
+                       headers={"X-Mirai-Profile": "wall", "X-Admin-Token": TOKEN})
+    assert resp.json() == {"text": "ABC", "reversed": "cba"}
+    names = _functions(tmp_path / f"{resp.headers['X-Mirai-Profile-Id']}.prof")
+    assert {"_marker_handler", "_marker_pool", "solve_dependencies"} <= names
+
+
+def test_profile_covers_stream_iterator(client, tmp_path):
+    resp = client.get("/stream", headers={"X-Mirai-Profile": "cpu", "X-Admin-Token": TOKEN})
+    assert resp.text == "0\n1\n2\n"
+    assert "_marker_stream" in _functions(tmp_path / f"{resp.headers['X-Mirai-Profile-Id']}.prof")
+
+
+@pytest.mark.parametrize("token", [None, "errado"])
+def test_profile_header_requires_admin_token(client, tmp_path, token):
+    headers = {"X-Mirai-Profile": "wall"}
+    if token:
+        headers["X-Admin-Token"] = token
+    resp = client.post("/ask", json={"text": "abc"}, headers=headers)
+    assert resp.status_code == 200
+    assert "X-Mirai-Profile-Id" not in resp.headers
+    assert not list(tmp_path.glob("*.prof"))
+
+
+def test_only_one_profile_at_a_time(client):
+    with profiling._active:
+        resp = client.post("/ask", json={"text": "abc"},
+                           headers={"X-Mirai-Profile": "wall", "X-Admin-Token": TOKEN})
+    assert resp.status_code == 200
+    assert "X-Mirai-Profile-Id" not in resp.headers
+
+
+def test_admin_token_fails_closed(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", None)
+    assert not profiling.check_admin_token("")
+    assert not profiling.check_admin_token("qualquer")
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+    assert profiling.check_admin_token(TOKEN)
+    assert not profiling.check_admin_token(TOKEN + "x")
+
+
+def test_admin_routes_not_registered_without_profiling():
+    from main import app
+
+    assert TestClient(app).get("/admin/profiles").status_code == 404
+
+
+def test_sampling_disabled_without_admin_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", None)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware, sample_rate=1.0)
+
+    @app.get("/ping")
+    @profiling.profiled
+    def ping():
+        return {"ok": True}
+
+    resp = TestClient(app).get("/ping")
+    assert resp.status_code == 200
+    assert "X-Mirai-Profile-Id" not in resp.headers
+    assert not list(tmp_path.glob("*.prof"))
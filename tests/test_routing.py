@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from app.mirai_agents import routing
+from app.mirai_agents.routing import DEFAULT_ROUTING_CONFIG, RouteDecision, record_route, route_model, validate_config
+
+
+def _config(**overrides) -> dict:
+    config = json.loads(json.dumps(DEFAULT_ROUTING_CONFIG))
+    config.update(overrides)
+    return validate_config(config)
+
+
+def test_short_greeting_goes_to_light_tier():
+    assert route_model("natural", "oi!").tier == "light"
+
+
+def test_long_study_session_goes_to_strong_tier():
+    decision = route_model("natural", "x" * 3000, classificacao="sessao_de_estudos")
+    assert decision.tier == "strong"
+    assert decision.model_name == DEFAULT_ROUTING_CONFIG["tiers"]["strong"]["model"]
+
+
+def test_explicit_model_name_wins():
+    decision = route_model("planner", "x" * 5000, model_name="gemini-custom")
+    assert (decision.tier, decision.model_name) == ("explicit", "gemini-custom")
+
+
+def test_missing_prices_default_to_zero():
+    config = _config(tiers={"only": {"model": "m"}}, agents={"natural": "only"})
+    assert config["tiers"]["only"]["input_cost_per_1m"] == 0.0
+
+
+@pytest.mark.parametrize("overrides", [
+    {"tiers": {"x": {"input_cost_per_1m": 1}}},
+    {"tiers": {"x": {"model": "m"}}, "agents": {"natural": "light"}},
+])
+def test_invalid_config_is_rejected_at_load(overrides):
+    with pytest.raises(ValueError):
+        _config(**overrides)
+
+
+def test_record_route_never_raises(monkeypatch):
+    monkeypatch.setitem(routing.ROUTING_CONFIG, "tiers", {"light": {"model": "m"}})  # sem preços
+    routing.record_route(RouteDecision("natural", "light", "m"), 0.1, 100, 100)
+    monkeypatch.setattr(routing, "_estimate_cost", lambda *a: 1 / 0)
+    routing.record_route(RouteDecision("natural", "light", "m"), 0.1, 100, 100)
+
+
+def _row(agent, model):
+    return next(r for r in routing.routing_metrics() if r["agent"] == agent and r["model_name"] == model)
+
+
+def test_explicit_model_priced_by_matching_tier():
+    decision = route_model("teste_custo", "x", model_name="gemini-1.5-pro")
+    record_route(decision, 1.0, input_chars=4_000_000, output_chars=0)
+    # 1M tokens de entrada no preço do tier strong
+    assert _row("teste_custo", "gemini-1.5-pro")["estimated_cost_usd"] == pytest.approx(1.25)
+
+
+def test_explicit_unknown_model_has_unknown_cost():
+    decision = route_model("teste_custo", "x", model_name="modelo-fora-dos-tiers")
+    record_route(decision, 1.0, input_chars=4000, output_chars=4000)
+    assert _row("teste_custo", "modelo-fora-dos-tiers")["estimated_cost_usd"] is None
+
+
+def test_routing_metrics_endpoint_reports_pid():
+    import os
+
+    from fastapi.testclient import TestClient
+    from main import app
+
+    body = TestClient(app).get("/metrics/routing").json()
+    assert body["pid"] == os.getpid() and "routes" in body
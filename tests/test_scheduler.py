@@ -0,0 +1,225 @@
+import threading
+import time
+
+import anyio
+import pytest
+
+from app.scheduler import (
+    ANONYMOUS_TENANT,
+    BULK,
+    INTERACTIVE,
+    DEFAULT_SCHEDULER_CONFIG,
+    AdmissionControl,
+    UpstreamScheduler,
+    classify,
+    per_process,
+    validate_config,
+)
+
+
+def test_per_process_splits_deploy_limits():
+    config = dict(DEFAULT_SCHEDULER_CONFIG, tenant_max_concurrency=5, tenant_quotas={"escola": 1})
+    out = per_process(config, 4)
+    assert out["capacity"] == 4
+    assert out["reserved"] == {INTERACTIVE: 1}
+    assert out["admission"] == {BULK: 3}
+    assert out["tenant_max_concurrency"] == 2  # arredonda para cima
+    assert out["tenant_quotas"] == {"escola": 1}
+    assert per_process(config, 1)["capacity"] == DEFAULT_SCHEDULER_CONFIG["capacity"]
+
+
+def test_reserved_never_takes_whole_capacity():
+    out = per_process(dict(DEFAULT_SCHEDULER_CONFIG, capacity=4), 4)
+    assert out["capacity"] == 1 and out["reserved"][INTERACTIVE] == 0
+
+
+def test_admission_waits_in_event_loop_and_times_out():
+    control = AdmissionControl(dict(DEFAULT_SCHEDULER_CONFIG, admission={BULK: 1}, queue_timeout=0.1))
+
+    async def other_request(results):
+        # cada requisição é uma task própria
+        try:
+            control.release(await control.acquire(BULK))
+            results.append("ok")
+        except TimeoutError:
+            results.append("timeout")
+
+    async def scenario():
+        held = await control.acquire(BULK)
+        assert await control.acquire(INTERACTIVE) is None  # classe sem limite
+        results = []
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(other_request, results)
+        assert results == ["timeout"]
+        assert control.metrics()[BULK] == {"limit": 1, "in_flight": 1, "waiting": 0}
+        control.release(held)
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(other_request, results)
+        assert results == ["timeout", "ok"]
+
+    anyio.run(scenario)
+
+
+class RecordingAdmission:
+    def __init__(self):
+        self.classes = []
+
+    async def acquire(self, priority_class):
+        self.classes.append(priority_class)
+
+    @staticmethod
+    def release(held):
+        pass
+
+    @staticmethod
+    def metrics():
+        return {}
+
+
+def test_only_llm_routes_go_through_admission(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import scheduler as scheduler_module
+    from app.jobs import get_store
+    from app.routers import jobs as jobs_router
+    from main import app
+
+    recorder = RecordingAdmission()
+    monkeypatch.setattr(scheduler_module, "admission", recorder)
+    monkeypatch.setattr(jobs_router, "STREAM_MAX_SECONDS", 0.5)
+    client = TestClient(app)
+
+    job_id = get_store().submit([{"tema": "t", "question": "q"}], {"temperature": 0.4})  # fica pendente
+    assert client.get("/health").status_code == 200
+    assert client.get(f"/mirai_agents/jobs/{job_id}").status_code == 200
+    stream = client.get(f"/mirai_agents/jobs/{job_id}/stream", params={"interval": 0.5})
+    assert stream.text.splitlines()[-1] == '{"timeout": true}'
+    assert client.get("/metrics/scheduler").status_code == 200
+    assert recorder.classes == []
+
+    assert classify("/mirai_agents/jobs/abc/stream") is None
+    assert classify("/mirai_agents/planner/ask") == BULK
+    assert classify("/mirai_agents/natural/ask/") == INTERACTIVE
+
+
+def _config(**overrides):
+    import json
+
+    config = json.loads(json.dumps(DEFAULT_SCHEDULER_CONFIG))
+    config.update(overrides)
+    return config
+
+
+@pytest.mark.parametrize("overrides,message", [
+    ({"weights": {INTERACTIVE: 4, BULK: 0}}, "peso de 'bulk'"),
+    ({"weights": {"urgente": 2}}, "classe desconhecida 'urgente'"),
+    ({"endpoints": {"/x": "vip"}}, "classe desconhecida 'vip'"),
+    ({"tenant_classes": {"escola": "vip"}}, "classe desconhecida 'vip'"),
+    ({"reserved": {INTERACTIVE: 16}}, "soma de reserved"),
+    ({"capacity": 0}, "capacity"),
+    ({"admission": {BULK: -1}}, "admission.bulk"),
+    ({"queue_timeout": 0}, "queue_timeout"),
+])
+def test_validate_config_rejects_bad_values(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        validate_config(_config(**overrides))
+
+
+def test_validate_config_accepts_default():
+    assert validate_config(_config())["weights"] == {INTERACTIVE: 4.0, BULK: 1.0}
+
+
+def _scheduler(**overrides):
+    return UpstreamScheduler(validate_config(_config(**overrides)))
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timeout esperando o scheduler"
+        time.sleep(0.005)
+
+
+class _Queued:
+    """Enfileira acquire() em threads, na ordem chamada, e registra a ordem de liberação."""
+
+    def __init__(self, sched):
+        self.sched = sched
+        self.granted = []  # (label, waiter) na ordem em que saíram da fila
+
+    def add(self, label, priority_class, tenant=None):
+        before = len(self.sched._queues.get(priority_class, ()))
+
+        def run():
+            w = self.sched.acquire(priority_class, tenant)
+            self.granted.append((label, w))
+
+        threading.Thread(target=run, daemon=True).start()
+        _wait_until(lambda: len(self.sched._queues.get(priority_class, ())) > before)
+
+    def release_next(self):
+        n = len(self.granted)
+        self.sched.release(self.granted[n - 1][1])
+
+
+def test_weighted_fair_queuing_favors_interactive_without_starving_bulk():
+    sched = _scheduler(capacity=1, reserved={}, weights={INTERACTIVE: 4, BULK: 1})
+    holder = sched.acquire(BULK)
+    q = _Queued(sched)
+    for i in range(5):
+        q.add(f"b{i}", BULK)
+    for i in range(5):
+        q.add(f"i{i}", INTERACTIVE)
+
+    sched.release(holder)
+    for n in range(1, 10):
+        _wait_until(lambda: len(q.granted) == n)
+        q.release_next()
+    _wait_until(lambda: len(q.granted) == 10)
+
+    order = [label for label, _ in q.granted]
+    assert [label[0] for label in order[:5]].count("i") == 4  # peso 4:1
+    assert "b0" in order[:6]  # bulk ainda avança
+    # dentro de cada classe, FIFO
+    assert [x for x in order if x[0] == "b"] == [f"b{i}" for i in range(5)]
+
+
+def test_reserved_slots_only_for_interactive_and_queue_timeout():
+    sched = _scheduler(capacity=2, reserved={INTERACTIVE: 1}, queue_timeout=0.1)
+    bulk = sched.acquire(BULK)
+    with pytest.raises(TimeoutError):
+        sched.acquire(BULK)  # o slot livre é reservado
+    interactive = sched.acquire(INTERACTIVE)  # entra na hora
+
+    metrics = sched.metrics()
+    assert metrics["in_use"] == 2
+    assert metrics["classes"][BULK]["queued"] == 0  # quem desistiu sai da fila
+    assert metrics["classes"][BULK]["requests"] == 2
+    sched.release(bulk)
+    sched.release(interactive)
+    assert sched.metrics()["in_use"] == 0
+
+
+def test_tenant_over_quota_is_skipped_not_blocking_others():
+    sched = _scheduler(capacity=3, reserved={}, tenant_quotas={"escola_a": 1})
+    first = sched.acquire(BULK, "escola_a")
+    q = _Queued(sched)
+    q.add("a2", BULK, "escola_a")  # acima da cota: espera
+
+    other = sched.acquire(BULK, "escola_b")  # passa na frente, há capacidade
+    assert q.granted == []
+    sched.release(first)
+    _wait_until(lambda: [label for label, _ in q.granted] == ["a2"])
+    sched.release(other)
+    sched.release(q.granted[0][1])
+
+
+def test_requests_without_tenant_share_the_anonymous_quota():
+    sched = _scheduler(capacity=4, reserved={}, tenant_max_concurrency=1, queue_timeout=0.1)
+    anon = sched.acquire(BULK)
+    with pytest.raises(TimeoutError):
+        sched.acquire(BULK, None)  # omitir o header não escapa da cota
+    named = sched.acquire(BULK, "escola_a")
+    assert sched._in_use_by_tenant[ANONYMOUS_TENANT] == 1
+    sched.release(anon)
+    sched.release(named)
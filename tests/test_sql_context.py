@@ -0,0 +1,157 @@
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import sql_context
+from app.sql_context import SqlConfigError, SqlContextExecutor, SqlIdentityError, load_queries
+
+QUERIES = {
+    "notas": {
+        "sql": "SELECT disciplina, nota FROM notas WHERE aluno_id = :aluno_id ORDER BY disciplina",
+        "params": ["aluno_id"],
+        "max_rows": 10,
+        "ttl": 60,
+    },
+    "notas_sem_cache": {
+        "sql": "SELECT disciplina, nota FROM notas WHERE aluno_id = :aluno_id ORDER BY disciplina;",
+        "params": ["aluno_id"],
+        "ttl": 0,
+    },
+    "minhas_notas": {
+        "sql": "SELECT disciplina, nota FROM notas WHERE aluno_id = :aluno_id ORDER BY disciplina LIMIT :n",
+        "params": ["n"],
+        "bound_params": {"aluno_id": "X-Mirai-User-Id"},
+    },
+}
+
+
+@pytest.fixture
+def executor(tmp_path):
+    db = tmp_path / "escola.db"
+    with sqlite3.connect(db) as conn:
+        conn.execute("CREATE TABLE notas (aluno_id INTEGER, disciplina TEXT, nota REAL)")
+        conn.executemany("INSERT INTO notas VALUES (1, ?, ?)", [(f"disciplina {i:02d}", 7.5) for i in range(30)])
+        conn.execute("INSERT INTO notas VALUES (2, 'só do aluno 2', 3.0)")
+    path = tmp_path / "queries.json"
+    path.write_text(json.dumps(QUERIES), encoding="utf-8")
+    return SqlContextExecutor(f"sqlite+aiosqlite:///{db}", load_queries(str(path))), db
+
+
+def _run(executor, coro_fn):
+    async def scenario():
+        try:
+            return await coro_fn(executor)
+        finally:
+            await executor.dispose()
+
+    return asyncio.run(scenario())
+
+
+def test_row_cap_marks_truncation(executor):
+    ex, _ = executor
+    out = _run(ex, lambda ex: ex.fetch_context("notas", {"aluno_id": 1}))
+    lines = out.splitlines()
+    assert lines[0] == "disciplina|nota"
+    assert len(lines) == 1 + 10 + 1
+    assert lines[-1] == "... (mais linhas omitidas)"
+
+
+def test_char_budget_omits_rows(executor):
+    ex, _ = executor
+    out = _run(ex, lambda ex: ex.fetch_context("notas_sem_cache", {"aluno_id": 1}, max_chars=100))
+    lines = out.splitlines()
+    assert len("\n".join(lines[:-1])) <= 100
+    assert lines[-1] == f"... ({30 - (len(lines) - 2)} linhas omitidas)"
+
+
+def test_ttl_cache_per_query(executor):
+    ex, db = executor
+
+    async def scenario(ex):
+        cached = await ex.fetch_context("notas", {"aluno_id": 1})
+        uncached = await ex.fetch_context("notas_sem_cache", {"aluno_id": 1})
+        with sqlite3.connect(db) as conn:
+            conn.execute("UPDATE notas SET nota = 9.0")
+        return (cached, await ex.fetch_context("notas", {"aluno_id": 1}),
+                uncached, await ex.fetch_context("notas_sem_cache", {"aluno_id": 1}))
+
+    cached_before, cached_after, uncached_before, uncached_after = _run(ex, scenario)
+    assert cached_after == cached_before  # ttl 60: ainda do cache
+    assert uncached_after != uncached_before and "9.0" in uncached_after  # ttl 0: relê
+
+
+@pytest.mark.parametrize("name,params", [
+    ("notas", {}),                                   # faltando
+    ("notas", {"aluno_id": 1, "extra": 2}),          # não permitido
+    ("notas", {"aluno_id": [1, 2]}),                 # não escalar
+    ("apaga_tudo", {}),                              # fora da whitelist
+])
+def test_rejects_invalid_requests(executor, name, params):
+    ex, _ = executor
+    with pytest.raises(ValueError):
+        _run(ex, lambda ex: ex.fetch_context(name, params))
+
+
+def test_bound_params_come_from_trusted_header(executor):
+    ex, _ = executor
+
+    async def scenario(ex):
+        aluno_1 = await ex.fetch_context("minhas_notas", {"n": 5}, headers={"x-mirai-user-id": "1"})
+        aluno_2 = await ex.fetch_context("minhas_notas", {"n": 5}, headers={"x-mirai-user-id": "2"})
+        return aluno_1, aluno_2
+
+    aluno_1, aluno_2 = _run(ex, scenario)
+    assert "só do aluno 2" not in aluno_1 and len(aluno_1.splitlines()) == 6
+    assert aluno_2.splitlines()[1] == "só do aluno 2|3.0"  # cache separado por identidade
+
+
+def test_bound_params_cannot_come_from_body_or_be_missing(executor):
+    ex, _ = executor
+    with pytest.raises(ValueError):
+        _run(ex, lambda ex: ex.fetch_context("minhas_notas", {"n": 5, "aluno_id": 2},
+                                             headers={"x-mirai-user-id": "1"}))
+    with pytest.raises(SqlIdentityError):
+        _run(ex, lambda ex: ex.fetch_context("minhas_notas", {"n": 5}))
+
+
+@pytest.mark.parametrize("content", [
+    "{não é json",
+    json.dumps({"apaga": {"sql": "DELETE FROM notas"}}),
+    json.dumps({"duas": {"sql": "SELECT 1; DROP TABLE notas"}}),
+    json.dumps({"sem_sql": {"params": []}}),
+    json.dumps({"params_ruins": {"sql": "SELECT 1", "params": "aluno_id"}}),
+    json.dumps({"duplicado": {"sql": "SELECT :a", "params": ["a"], "bound_params": {"a": "x-user"}}}),
+])
+def test_bad_whitelist_is_config_error(tmp_path, content):
+    path = tmp_path / "queries.json"
+    path.write_text(content, encoding="utf-8")
+    with pytest.raises(SqlConfigError):
+        load_queries(str(path))
+
+
+def test_bad_whitelist_returns_503(tmp_path, monkeypatch):
+    from main import app
+
+    path = tmp_path / "queries.json"
+    path.write_text("{não é json", encoding="utf-8")
+    monkeypatch.setattr(sql_context, "SQL_URL", f"sqlite+aiosqlite:///{tmp_path / 'x.db'}")
+    monkeypatch.setattr(sql_context, "SQL_QUERIES", str(path))
+    monkeypatch.setattr(sql_context, "_executor", None)
+
+    resp = TestClient(app).post("/mirai_agents/natural/ask", json={"question": "minhas notas?", "query": "notas"})
+    assert resp.status_code == 503
+    with pytest.raises(SqlConfigError):
+        sql_context.init_executor()
+
+
+def test_missing_identity_header_returns_401(executor, monkeypatch):
+    from main import app
+
+    ex, _ = executor
+    monkeypatch.setattr(sql_context, "_executor", ex)
+    resp = TestClient(app).post("/mirai_agents/natural/ask",
+                                json={"question": "minhas notas?", "query": "minhas_notas", "query_params": {"n": 3}})
+    assert resp.status_code == 401
@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain.schema import AIMessage
+
+from app.mirai_agents import teacher_agent
+from app.mirai_agents.teacher_agent import TeacherAgent
+
+SECTION_SECONDS = 0.2
+TITLES = ["Conceitos", "Exemplos", "Verificação", "Próximos passos"]
+
+
+class TimedLLM:
+    """
+    Latência proporcional ao tamanho da saída (como geração token a token):
+    a aula inteira custa o mesmo que as quatro seções somadas.
+    """
+
+    def __init__(self, fail_on=None, **kwargs):
+        self.fail_on = fail_on
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        prompt = messages[-1].content
+        if "ESBOÇO DA AULA" in prompt:
+            time.sleep(0.02)
+            return AIMessage(content="\n".join(f"{i + 1}. {t}" for i, t in enumerate(TITLES)))
+        if "SEÇÃO A ESCREVER" in prompt:
+            title = prompt.strip().splitlines()[-1]
+            with self._lock:
+                self.calls.append(title)
+            if title == self.fail_on:
+                raise RuntimeError(f"falha em {title}")
+            time.sleep(SECTION_SECONDS)
+            return AIMessage(content=f"conteúdo de {title}")
+        time.sleep(SECTION_SECONDS * len(TITLES))
+        return AIMessage(content="\n\n".join(f"## {t}\n\nconteúdo de {t}" for t in TITLES))
+
+
+def _agent(**kwargs) -> TeacherAgent:
+    agent = TeacherAgent(max_concurrency=kwargs.pop("max_concurrency", 4))
+    agent._llm = TimedLLM(**kwargs)
+    return agent
+
+
+def test_sections_mode_is_faster_than_single_call():
+    agent = _agent()
+
+    started = time.perf_counter()
+    single = agent.teach("Normalização", "1FN, 2FN, 3FN")
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sections = agent.teach_sections("Normalização", "1FN, 2FN, 3FN")
+    sections_s = time.perf_counter() - started
+
+    assert sections == single  # montado na ordem do esboço
+    assert sections_s < single_s * 0.5, (single_s, sections_s)
+
+
+def test_concurrency_cap_is_respected():
+    agent = _agent(max_concurrency=2)
+    started = time.perf_counter()
+    agent.teach_sections("Normalização", "1FN, 2FN, 3FN")
+    # 4 seções, 2 por vez -> duas "rodadas"
+    assert time.perf_counter() - started >= SECTION_SECONDS * 2
+
+
+def test_failed_section_cancels_pending_ones():
+    agent = _agent(max_concurrency=1, fail_on=TITLES[0])
+    started = time.perf_counter()
+    with pytest.raises(RuntimeError, match="falha em Conceitos"):
+        agent.teach_sections("Normalização", "1FN, 2FN, 3FN")
+    assert time.perf_counter() - started < SECTION_SECONDS
+    time.sleep(SECTION_SECONDS)
+    assert agent._llm.calls == [TITLES[0]]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(teacher_agent, "ChatGoogleGenerativeAI", TimedLLM)
+    from main import app
+    return TestClient(app)
+
+
+def test_stream_yields_outline_then_each_section(client):
+    r = client.post("/mirai_agents/professor/ask/stream", json={"question": "Normalização", "plan": "1FN"})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0] == {"outline": TITLES}
+    assert sorted(line["index"] for line in lines[1:]) == [0, 1, 2, 3]
+
+
+def test_stream_rejects_mode(client):
+    r = client.post(
+        "/mirai_agents/professor/ask/stream",
+        json={"question": "Normalização", "plan": "1FN", "mode": "single"},
+    )
+    assert r.status_code == 422